@@ -1,8 +1,17 @@
 # app.py
+import sys
+
+if __name__ == "__main__" and "--profile-startup" in sys.argv:
+    # python app.py --profile-startup [--min-ms 2]: árbol de imports + fases de create_app
+    from services.startup_profile import main
+    sys.exit(main(sys.argv[1:]))
+
 from app_factory import create_app
+from services.module_watcher import reloader_exclude_patterns
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run()
+    # modules/ no reinicia el proceso: lo recarga ModuleHotReloader en caliente
+    app.run(exclude_patterns=reloader_exclude_patterns(app))
 
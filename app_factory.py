@@ -3,27 +3,106 @@ from __future__ import annotations
 
 from flask import Flask
 
+from cli_commands import register_cli
 from config import Settings
 from oauth_client import register_cubicornio_oauth
+from routes.guidelines_api import guidelines_api_bp
 from routes.main import main_bp
+from routes.metrics import metrics_bp
 from routes.oauth_cubicornio import cubicornio_auth_bp
+from routes.status_api import status_api_bp
 from routes.submodule_workspace_api import workspace_api_bp
+from services.guidelines_search import init_guidelines_search
+from services.metrics import init_metrics, install_request_metrics
+from services.module_loader import init_module_loader
+from services.module_watcher import init_module_hot_reload
+from services.request_timing import init_request_timing, install_request_timing
+from services.session_store import init_session_store
+from services.startup_profile import StartupPhases
+from services.static_assets import init_static_assets
+from services.submodule_workspace import init_workspace
+from services.template_cache import init_template_cache, warm_templates
+from services.token_refresh import token_refresher
 
 def create_app() -> Flask:
-    app = Flask(__name__, template_folder="templates")
-    app.config.from_object(Settings)
+    startup = StartupPhases()
 
-    # Config de cookies de sesión
-    app.config["SESSION_COOKIE_SECURE"] = Settings.SESSION_COOKIE_SECURE
-    app.config["SESSION_COOKIE_HTTPONLY"] = Settings.SESSION_COOKIE_HTTPONLY
-    app.config["SESSION_COOKIE_SAMESITE"] = Settings.SESSION_COOKIE_SAMESITE
+    with startup.phase("config"):
+        app = Flask(__name__, template_folder="templates")
+        app.config.from_object(Settings)
 
-    # Registrar cliente OAuth de Cubicornio
-    register_cubicornio_oauth(app)
+        # Config de cookies de sesión
+        app.config["SESSION_COOKIE_SECURE"] = Settings.SESSION_COOKIE_SECURE
+        app.config["SESSION_COOKIE_HTTPONLY"] = Settings.SESSION_COOKIE_HTTPONLY
+        app.config["SESSION_COOKIE_SAMESITE"] = Settings.SESSION_COOKIE_SAMESITE
+
+    # Bytecode de Jinja en disco, compartido por workers (y por las apps hijas)
+    with startup.phase("template_cache"):
+        init_template_cache(app)
+
+    # Server-Timing / request id / log por request (no-op si REQUEST_TIMING=false)
+    with startup.phase("request_timing"):
+        timing_enabled = init_request_timing(app)
+
+    # Métricas multi-worker (/metrics): requests en curso + hit ratio de caches
+    with startup.phase("metrics"):
+        metrics_enabled = init_metrics(app) is not None
+
+    # Session server-side (la cookie solo lleva el id)
+    with startup.phase("session_store"):
+        init_session_store(app)
+
+    # Workspace del submódulo: 1 instancia compartida (memo de get_selected)
+    with startup.phase("workspace"):
+        workspace = init_workspace(app)
+
+    # Registrar cliente OAuth de Cubicornio (authlib se importa recién al 1er login)
+    with startup.phase("oauth"):
+        register_cubicornio_oauth(app)
+        # resultados de refresh que dejó un worker caído (no esperan al próximo refresh)
+        token_refresher.purge_expired()
 
     # Blueprints
-    app.register_blueprint(main_bp)
-    app.register_blueprint(cubicornio_auth_bp)
-    app.register_blueprint(workspace_api_bp)
+    with startup.phase("blueprints"):
+        app.register_blueprint(main_bp)
+        app.register_blueprint(cubicornio_auth_bp)
+        app.register_blueprint(workspace_api_bp)
+        app.register_blueprint(status_api_bp)
+        app.register_blueprint(guidelines_api_bp)
+        app.register_blueprint(metrics_bp)
+
+    # Índice de búsqueda de las guías (se rearma solo si cambia un partial)
+    with startup.phase("guidelines_index"):
+        init_guidelines_search(app)
+
+    # Submódulos declarados en modules/*/*/module.manifest.json (import diferido)
+    with startup.phase("module_loader"):
+        loader = init_module_loader(app)
+        # las apps hijas no pasan por los hooks del core: timing y métricas van en cada una
+        if timing_enabled:
+            loader.child_hooks.append(lambda mod, child: install_request_timing(child))
+        if metrics_enabled:
+            loader.child_hooks.append(lambda mod, child: install_request_metrics(child))
+
+    # Assets con hash de contenido + precomprimidos (core y submódulos)
+    if Settings.STATIC_ASSET_PIPELINE:
+        with startup.phase("static_assets"):
+            init_static_assets(app, loader)
+
+    # Compilar todos los templates ahora y no en el 1er request de cada página
+    if Settings.TEMPLATE_WARMUP:
+        with startup.phase("template_warmup"):
+            warm_templates(app, loader)
+
+    # Hot reload solo del submódulo seleccionado (el core sigue con el reloader de Werkzeug)
+    if Settings.MODULE_HOT_RELOAD:
+        with startup.phase("module_hot_reload"):
+            init_module_hot_reload(app, loader, workspace)
+
+    # Comandos CLI (flask cubi-cache ...)
+    with startup.phase("cli"):
+        register_cli(app)
 
+    app.extensions["startup_phases"] = startup.phases
+    app.logger.debug("create_app: %s", ", ".join(f"{p['name']}={p['ms']}ms" for p in startup.phases))
     return app
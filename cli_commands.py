@@ -0,0 +1,53 @@
+# cli_commands.py
+import json
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from services.disk_cache import open_disk_cache
+from services.module_loader import EXTENSION_KEY as MODULE_LOADER_KEY
+from services.static_assets import build_static_assets
+
+
+cache_cli = AppGroup("cubi-cache", help="Inspecciona o purga el cache en disco de Cubicornio.")
+
+
+@cache_cli.command("stats")
+def cache_stats():
+    """
+    Muestra entradas / bytes por namespace (profile, upstream).
+    """
+    click.echo(json.dumps(open_disk_cache().stats(), indent=2, ensure_ascii=False))
+
+
+@cache_cli.command("purge")
+@click.option("--namespace", "-n", default=None, help="Solo este namespace (profile, upstream).")
+@click.option("--expired", is_flag=True, help="Solo entradas con TTL vencido.")
+def cache_purge(namespace, expired):
+    """
+    Borra entradas del cache en disco.
+    """
+    removed = open_disk_cache().purge(namespace=namespace, expired_only=expired)
+    click.echo(f"{removed} entradas eliminadas.")
+
+
+assets_cli = AppGroup("assets", help="Build de assets estáticos (hash + .gz/.br).")
+
+
+@assets_cli.command("build")
+def assets_build():
+    """
+    Genera los assets con hash y sus variantes precomprimidas (core + submódulos).
+    Idempotente: correrlo en el deploy evita hacerlo en el 1er arranque.
+    """
+    pipeline = build_static_assets(current_app, current_app.extensions.get(MODULE_LOADER_KEY))
+    click.echo(json.dumps(pipeline.stats(), indent=2, ensure_ascii=False))
+
+
+def register_cli(app):
+    """
+    Registra los comandos `flask ...` propios del bundle.
+    """
+    app.cli.add_command(cache_cli)
+    app.cli.add_command(assets_cli)
@@ -1,5 +1,7 @@
 # config.py
 import os
+from pathlib import Path
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,6 +31,120 @@ class Settings:
         "https://cubicornio.com/api/",
     )
 
+    # Host de Cubicornio: única fuente de verdad para las llamadas salientes del bundle
+    # (los paths /dev/oauth/... y /api/v1/... se resuelven contra este host)
+    CUBICORNIO_BASE_URL = os.getenv(
+        "CUBICORNIO_BASE_URL",
+        "https://cubicornio.com",
+    )
+
+    # Cliente HTTP compartido hacia Cubicornio (pool keep-alive por proceso)
+    CUBICORNIO_HTTP_POOL_SIZE = int(os.getenv("CUBICORNIO_HTTP_POOL_SIZE", "10"))
+    CUBICORNIO_HTTP_CONNECT_TIMEOUT = float(os.getenv("CUBICORNIO_HTTP_CONNECT_TIMEOUT", "3.05"))
+    CUBICORNIO_HTTP_READ_TIMEOUT = float(os.getenv("CUBICORNIO_HTTP_READ_TIMEOUT", "10"))
+    CUBICORNIO_HTTP_GET_RETRIES = int(os.getenv("CUBICORNIO_HTTP_GET_RETRIES", "2"))
+    CUBICORNIO_HTTP_BACKOFF_SECONDS = float(os.getenv("CUBICORNIO_HTTP_BACKOFF_SECONDS", "0.2"))
+
+    # Estado local compartido entre workers (locks, caches en disco, etc.)
+    BUNDLE_CACHE_DIR = os.getenv(
+        "BUNDLE_CACHE_DIR",
+        str(Path(__file__).resolve().parent / ".bundle_cache"),
+    )
+
+    # Circuit breaker hacia Cubicornio (ventana deslizante por worker)
+    CUBICORNIO_BREAKER_WINDOW_SECONDS = float(os.getenv("CUBICORNIO_BREAKER_WINDOW_SECONDS", "60"))
+    CUBICORNIO_BREAKER_MIN_CALLS = int(os.getenv("CUBICORNIO_BREAKER_MIN_CALLS", "10"))
+    CUBICORNIO_BREAKER_FAILURE_RATE = float(os.getenv("CUBICORNIO_BREAKER_FAILURE_RATE", "0.5"))
+    CUBICORNIO_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("CUBICORNIO_BREAKER_SLOW_CALL_SECONDS", "3"))
+    CUBICORNIO_BREAKER_OPEN_SECONDS = float(os.getenv("CUBICORNIO_BREAKER_OPEN_SECONDS", "30"))
+    CUBICORNIO_BREAKER_HALF_OPEN_CALLS = int(os.getenv("CUBICORNIO_BREAKER_HALF_OPEN_CALLS", "2"))
+
+    # Refresh de tokens single-flight (entre threads y workers)
+    TOKEN_REFRESH_RESULT_TTL_SECONDS = float(os.getenv("TOKEN_REFRESH_RESULT_TTL_SECONDS", "30"))
+    TOKEN_REFRESH_LOCK_TIMEOUT_SECONDS = float(os.getenv("TOKEN_REFRESH_LOCK_TIMEOUT_SECONDS", "15"))
+
+    # Cache del perfil /dev/oauth/profile (por hash del access_token)
+    PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", "60"))
+    PROFILE_CACHE_STALE_SECONDS = int(os.getenv("PROFILE_CACHE_STALE_SECONDS", "300"))
+    PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "512"))
+
+    # Cache de /api/v1/submodules y /init (revalida con ETag pasado este tiempo)
+    UPSTREAM_CACHE_FRESH_SECONDS = float(os.getenv("UPSTREAM_CACHE_FRESH_SECONDS", "30"))
+    UPSTREAM_CACHE_MAX_ENTRIES = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "1024"))
+
+    # Cache persistente en disco (SQLite) para perfil / catálogo / init payloads
+    DISK_CACHE_ENABLED = os.getenv("DISK_CACHE_ENABLED", "false").lower() == "true"
+    DISK_CACHE_PATH = os.getenv(
+        "DISK_CACHE_PATH",
+        str(Path(BUNDLE_CACHE_DIR) / "responses.sqlite3"),
+    )
+    DISK_CACHE_MAX_BYTES = int(os.getenv("DISK_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+    DISK_CACHE_STALE_IF_ERROR_SECONDS = float(os.getenv("DISK_CACHE_STALE_IF_ERROR_SECONDS", "86400"))
+
+    # POST /api/submodules/init:batch
+    INIT_BATCH_MAX_IDS = int(os.getenv("INIT_BATCH_MAX_IDS", "50"))
+    INIT_BATCH_WORKERS = int(os.getenv("INIT_BATCH_WORKERS", "4"))
+    INIT_BATCH_DEADLINE_SECONDS = float(os.getenv("INIT_BATCH_DEADLINE_SECONDS", "20"))
+
+    # Scaffold nativo de submódulos (clone de repo_url)
+    SCAFFOLD_GIT_TIMEOUT_SECONDS = float(os.getenv("SCAFFOLD_GIT_TIMEOUT_SECONDS", "120"))
+
+    # Mirrors bare locales de repo_url (solo se baja el delta en cada init)
+    REPO_MIRROR_ENABLED = os.getenv("REPO_MIRROR_ENABLED", "true").lower() == "true"
+    REPO_MIRROR_DIR = os.getenv("REPO_MIRROR_DIR", str(Path(BUNDLE_CACHE_DIR) / "mirrors"))
+    REPO_MIRROR_MAX_BYTES = int(os.getenv("REPO_MIRROR_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+    # Purge en background de workspaces borrados (modules/.trash)
+    TRASH_PURGE_WORKERS = int(os.getenv("TRASH_PURGE_WORKERS", "1"))
+
+    # Hot reload del submódulo seleccionado (por defecto: igual que FLASK_DEBUG)
+    MODULE_HOT_RELOAD = os.getenv("MODULE_HOT_RELOAD", os.getenv("FLASK_DEBUG", "false")).lower() in ("1", "true")
+    MODULE_WATCH_INTERVAL_SECONDS = float(os.getenv("MODULE_WATCH_INTERVAL_SECONDS", "1"))
+
+    # Templates: bytecode de Jinja en disco + precompilado al arrancar
+    TEMPLATE_BYTECODE_CACHE = os.getenv("TEMPLATE_BYTECODE_CACHE", "true").lower() == "true"
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", str(Path(BUNDLE_CACHE_DIR) / "jinja"))
+    TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "true").lower() == "true"
+
+    # Assets: nombres con hash + .gz/.br precomprimidos (por defecto: apagado con FLASK_DEBUG)
+    STATIC_ASSET_PIPELINE = os.getenv(
+        "STATIC_ASSET_PIPELINE",
+        "false" if os.getenv("FLASK_DEBUG", "false").lower() in ("1", "true") else "true",
+    ).lower() in ("1", "true")
+    STATIC_ASSETS_DIR = os.getenv("STATIC_ASSETS_DIR", str(Path(BUNDLE_CACHE_DIR) / "assets"))
+
+    # Páginas HTML en streaming: el shell sale antes de que responda Cubicornio
+    STREAM_PAGES = os.getenv("STREAM_PAGES", "true").lower() == "true"
+
+    # Server-Timing + log JSON por request (apagado: los @timed no envuelven nada)
+    REQUEST_TIMING = os.getenv("REQUEST_TIMING", "false").lower() == "true"
+
+    # /metrics (formato Prometheus): 1 archivo JSON por worker, se suman al leer
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_DIR = os.getenv("METRICS_DIR", str(Path(BUNDLE_CACHE_DIR) / "metrics"))
+    METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+    # Jobs de creación de workspace (estado en BUNDLE_CACHE_DIR/jobs)
+    WORKSPACE_JOB_WORKERS = int(os.getenv("WORKSPACE_JOB_WORKERS", "2"))
+    WORKSPACE_JOB_TTL_SECONDS = float(os.getenv("WORKSPACE_JOB_TTL_SECONDS", "3600"))
+
+    # Fan-out de _build_context: presupuesto total por página y tamaño del pool
+    CONTEXT_DEADLINE_SECONDS = float(os.getenv("CONTEXT_DEADLINE_SECONDS", "3"))
+    CONTEXT_FANOUT_WORKERS = int(os.getenv("CONTEXT_FANOUT_WORKERS", "8"))
+
+    # Session server-side: la cookie solo lleva un id opaco firmado
+    # SESSION_BACKEND = sqlite (multi-worker) | memory (1 worker) | cookie (session firmada de Flask)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+    SESSION_SQLITE_PATH = os.getenv(
+        "SESSION_SQLITE_PATH",
+        str(Path(BUNDLE_CACHE_DIR) / "sessions.sqlite3"),
+    )
+    SESSION_STORE_MAX_ENTRIES = int(os.getenv("SESSION_STORE_MAX_ENTRIES", "10000"))
+
+    # States OAuth pendientes por session (login iniciado y no terminado)
+    OAUTH_STATE_TTL_SECONDS = int(os.getenv("OAUTH_STATE_TTL_SECONDS", "600"))
+    OAUTH_STATE_MAX_ENTRIES = int(os.getenv("OAUTH_STATE_MAX_ENTRIES", "5"))
+
     # Opcional: endurecer cookies en producción
     SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "false").lower() == "true"
     SESSION_COOKIE_HTTPONLY = True
@@ -1,16 +1,19 @@
 # oauth_client.py
-from authlib.integrations.flask_client import OAuth
+import threading
 
+from flask import Flask, current_app
 
-oauth = OAuth()
+EXTENSION_KEY = "cubicornio_oauth_client"
 
+_client_lock = threading.Lock()
 
-def register_cubicornio_oauth(app):
+
+def register_cubicornio_oauth(app: Flask) -> None:
     """
-    Registra el cliente OAuth de Cubicornio usando la config del app.
+    Valida la config del cliente OAuth de Cubicornio.
+    ✅ authlib se importa recién en el 1er login/callback (get_cubicornio_client):
+    un worker que solo sirve páginas/estáticos no carga el stack OAuth.
     """
-    oauth.init_app(app)
-
     client_id = app.config.get("CUBICORNIO_CLIENT_ID")
     client_secret = app.config.get("CUBICORNIO_CLIENT_SECRET")
 
@@ -20,10 +23,17 @@ def register_cubicornio_oauth(app):
             "Edita tu .env antes de intentar loguearte."
         )
 
-    oauth.register(
+    app.extensions[EXTENSION_KEY] = None
+
+
+def _build_client(app: Flask):
+    from authlib.integrations.flask_client import OAuth
+
+    oauth = OAuth(app)
+    return oauth.register(
         name="cubicornio",
-        client_id=client_id,
-        client_secret=client_secret,
+        client_id=app.config.get("CUBICORNIO_CLIENT_ID"),
+        client_secret=app.config.get("CUBICORNIO_CLIENT_SECRET"),
         access_token_url=app.config["CUBICORNIO_OAUTH_TOKEN_URL"],
         authorize_url=app.config["CUBICORNIO_OAUTH_AUTHORIZE_URL"],
         api_base_url=app.config["CUBICORNIO_API_BASE_URL"],
@@ -32,3 +42,17 @@ def register_cubicornio_oauth(app):
             "scope": "bundle:read",
         },
     )
+
+
+def get_cubicornio_client():
+    """
+    Cliente OAuth "cubicornio" de la app actual (lo crea la 1ra vez).
+    """
+    app = current_app._get_current_object()
+    client = app.extensions.get(EXTENSION_KEY)
+    if client is None:
+        with _client_lock:
+            client = app.extensions.get(EXTENSION_KEY)
+            if client is None:
+                client = app.extensions[EXTENSION_KEY] = _build_client(app)
+    return client
@@ -0,0 +1,28 @@
+# routes/guidelines_api.py
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from services.guidelines_search import get_guidelines_search
+
+guidelines_api_bp = Blueprint("guidelines_api", __name__, url_prefix="/api/guidelines")
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+SEARCH_MAX_QUERY_CHARS = 200
+
+
+@guidelines_api_bp.get("/search")
+def guidelines_search():
+    """
+    Búsqueda full-text sobre las guías (title, summary, bullets y partials por id).
+    ✅ Índice invertido en memoria, ranking BM25, sin acentos (ver services/guidelines_search.py).
+    """
+    q = (request.args.get("q") or "").strip()[:SEARCH_MAX_QUERY_CHARS]
+    limit = request.args.get("limit", default=SEARCH_DEFAULT_LIMIT, type=int) or SEARCH_DEFAULT_LIMIT
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+
+    if not q:
+        return jsonify({"ok": True, "q": q, "results": [], "total": 0, "took_ms": 0.0}), 200
+
+    return jsonify({"ok": True, "q": q, **get_guidelines_search().search(q, limit=limit)}), 200
@@ -2,24 +2,44 @@
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from flask import Blueprint, Response, make_response, render_template, session, request, current_app, stream_template
+from werkzeug.local import LocalProxy
+
+from config import Settings
+from services.submodule_workspace import get_workspace
+
+from services.circuit_breaker import CircuitOpenError
+from services.cubicornio_client import PROFILE_PATH, SUBMODULES_LIST_PATH, cubi_get
+from services.cubicornio_oauth import (
+    ACCESS_REJECTED,
+    CubicornioAuthError,
+    authorized_get,
+    get_valid_access_token,
+    refresh_and_retry,
+)
+from services.fanout import FanOut, FanOutCall, FanOutResult
+from services.profile_cache import profile_cache
+from services.request_timing import timed
+from services.response_cache import upstream_cache
+from services.guidelines_page import guidelines_page
 
-import requests
-from flask import Blueprint, render_template, session, request, current_app
-
-from pathlib import Path
-from services.submodule_workspace import SubmoduleWorkspaceService
+main_bp = Blueprint("main", __name__)
 
-from services.cubicornio_oauth import get_valid_access_token, refresh_and_retry
-from services.submodule_guidelines import get_submodule_guidelines
+# El perfil bloquea el render: presupuesto de lectura más corto que el default
+PROFILE_READ_TIMEOUT = 5
 
-main_bp = Blueprint("main", __name__)
+# Dentro del fan-out el perfil corre con CONTEXT_DEADLINE_SECONDS: 1 solo intento y
+# lectura acotada al deadline, así no sigue reintentando después de mandar la página
+PROFILE_CONTEXT_READ_TIMEOUT = min(PROFILE_READ_TIMEOUT, Settings.CONTEXT_DEADLINE_SECONDS)
+PROFILE_CONTEXT_RETRIES = 0
 
-# Base URL de Cubicornio (prod)
-CUBICORNIO_BASE_URL = "https://cubicornio.com"
+# Fragmentos de Jinja por write en páginas con streaming
+STREAM_FLUSH_CHUNKS = 16
 
-PROJECT_ROOT = Path(__file__).resolve().parents[1]
-workspace = SubmoduleWorkspaceService(PROJECT_ROOT)
+# Pool acotado para las llamadas independientes de _build_context
+_context_fanout = FanOut(Settings.CONTEXT_FANOUT_WORKERS, thread_name_prefix="ctx-fanout")
 
 def _extract_access_token(token_obj: Any) -> Optional[str]:
     """
@@ -62,46 +82,137 @@ def _parse_scopes_from_token(token_obj: Any) -> List[str]:
 
 
 
-def _fetch_cubicornio_profile(token_obj: Any) -> Optional[Dict[str, Any]]:
+def _revalidate_profile(access_token: str) -> Optional[Dict[str, Any]]:
     """
-    Llama a Cubicornio /dev/oauth/profile
-    con refresh automático si expira.
+    Refresh en background para el cache (stale-while-revalidate).
+    Corre fuera del request: no toca la session ni intenta refresh del token.
     """
-    access_token, _ = get_valid_access_token()
-    if not access_token:
+    try:
+        resp = cubi_get(PROFILE_PATH, access_token, read_timeout=PROFILE_READ_TIMEOUT)
+        if not resp.ok:
+            return None
+        data = resp.json()
+    except Exception:
         return None
+    return data if isinstance(data, dict) else None
 
-    url = f"{CUBICORNIO_BASE_URL}/dev/oauth/profile"
-    headers = {"Authorization": f"Bearer {access_token}", "Accept": "application/json"}
+
+@timed("profile")
+def _fetch_cubicornio_profile(access_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Llama a Cubicornio /dev/oauth/profile con un access ya resuelto en el request.
+    ✅ Cacheado por hash del access_token (ver services/profile_cache.py).
+    Corre en el fan-out: no refresca ni toca la session; un 401 se propaga como
+    CubicornioAuthError(ACCESS_REJECTED) para que el request decida.
+    """
+    cached = profile_cache.get(access_token, revalidate=_revalidate_profile)
+    if cached is not None:
+        return cached
 
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
+        resp, access_token = authorized_get(
+            PROFILE_PATH,
+            read_timeout=PROFILE_CONTEXT_READ_TIMEOUT,
+            retries=PROFILE_CONTEXT_RETRIES,
+            access=access_token,
+        )
+    except CubicornioAuthError:
+        raise
+    except CircuitOpenError:
+        # ✅ Cubicornio caído: mejor el último perfil conocido que nada
+        return profile_cache.peek(access_token)
     except Exception:
         current_app.logger.exception("Error llamando a Cubicornio /dev/oauth/profile")
-        return None
-
-    # ✅ fallback: si Cubicornio dice invalid_token, intenta refresh y reintenta 1 vez
-    if resp.status_code == 401:
-        new_access = refresh_and_retry()
-        if not new_access:
-            return None
-        headers["Authorization"] = f"Bearer {new_access}"
-        resp = requests.get(url, headers=headers, timeout=5)
+        return profile_cache.peek(access_token)
 
     if not resp.ok:
         current_app.logger.warning("Cubicornio /profile responded %s: %s", resp.status_code, resp.text[:200])
-        return None
+        return profile_cache.peek(access_token) if resp.status_code >= 500 else None
 
     try:
-        return resp.json()
+        data = resp.json()
     except Exception:
         return None
 
+    if isinstance(data, dict):
+        profile_cache.put(access_token, data)
+    return data
 
 
-def _build_context() -> Dict[str, Any]:
-    token = session.get("cubicornio_token")
-    oauth_error = request.args.get("oauth_error")
+
+def _fetch_submodule_list(access_token: str) -> List[Dict[str, Any]]:
+    """
+    Catálogo de submódulos del usuario (mismo upstream y cache que /api/submodules/list).
+    """
+    try:
+        result = upstream_cache.get_json(SUBMODULES_LIST_PATH, access=access_token)
+    except CircuitOpenError:
+        return []
+    if not result.ok:
+        current_app.logger.warning("Cubicornio /submodules responded %s: %s", result.status_code, result.text[:200])
+        return []
+    data = result.data or {}
+    return data.get("submodules") or data.get("items") or []
+
+
+def _refresh_errors() -> Tuple[Type[Exception], ...]:
+    """
+    Errores de un refresh contra Cubicornio que degradan la página en vez de dar 500.
+    requests se importa acá: solo hace falta si hay token en la session.
+    """
+    import requests
+
+    return (CircuitOpenError, requests.RequestException)
+
+
+def _session_access() -> Optional[str]:
+    """
+    Access token vigente, resuelto (y refrescado si expiró) en el thread del request,
+    antes del fan-out: las tareas solo reciben el string.
+    """
+    if not session.get("cubicornio_token"):
+        return None
+    try:
+        access, _ = get_valid_access_token()
+    except _refresh_errors():
+        current_app.logger.warning("Refresh del token falló; la página sale sin datos de Cubicornio")
+        return None
+    return access
+
+
+def _access_rejected(fetched: FanOutResult) -> bool:
+    return any(
+        isinstance(exc, CubicornioAuthError) and exc.message == ACCESS_REJECTED
+        for exc in fetched.errors.values()
+    )
+
+
+def _start_context(access: Optional[str], with_profile: bool, with_submodules: bool) -> FanOutCall:
+    tasks: Dict[str, Callable[[], Any]] = {"selected": get_workspace().get_selected}
+    if access:
+        if with_profile:
+            tasks["profile"] = lambda: _fetch_cubicornio_profile(access)
+        if with_submodules:
+            tasks["submodules"] = lambda: _fetch_submodule_list(access)
+
+    return _context_fanout.start(
+        tasks,
+        deadline_seconds=Settings.CONTEXT_DEADLINE_SECONDS,
+        defaults={"submodules": []},
+    )
+
+
+def _resolve_context(token: Any, fetched: FanOutResult) -> Dict[str, Any]:
+    """
+    Arma las claves que dependen del upstream a partir del fan-out ya resuelto.
+    """
+    if fetched.partial:
+        current_app.logger.warning(
+            "_build_context parcial: timeout=%s failed=%s timings_ms=%s",
+            fetched.timed_out, fetched.failed, fetched.timings_ms,
+        )
+    else:
+        current_app.logger.debug("_build_context timings_ms=%s", fetched.timings_ms)
 
     cubi_user = None
     cubi_business = None
@@ -109,7 +220,7 @@ def _build_context() -> Dict[str, Any]:
     scopes: List[str] = []
 
     if token:
-        profile = _fetch_cubicornio_profile(token)
+        profile = fetched.values.get("profile")
         if profile:
             cubi_user = profile.get("user")
             cubi_business = profile.get("business")
@@ -125,32 +236,148 @@ def _build_context() -> Dict[str, Any]:
             scopes = _parse_scopes_from_token(token)
 
     return {
-        "token": token,
-        "oauth_error": oauth_error,
         "cubi_user": cubi_user,
         "cubi_business": cubi_business,
         "is_owner": is_owner,
         "scopes": scopes,
-        "cubicornio_url": CUBICORNIO_BASE_URL,
-        "selected": workspace.get_selected(),
-        "submodules": [],
+        "selected": fetched.values.get("selected"),
+        "submodules": fetched.values.get("submodules") or [],
+        "context_timings": fetched.timings_ms,
+        "context_partial": fetched.partial,
     }
 
 
+# Claves que _resolve_context llena desde el fan-out (las que esperan al upstream)
+_DEFERRED_KEYS = (
+    "cubi_user", "cubi_business", "is_owner", "scopes",
+    "selected", "submodules", "context_timings", "context_partial",
+)
+
+
+def _base_context(token: Any) -> Dict[str, Any]:
+    return {
+        "token": token,
+        "oauth_error": request.args.get("oauth_error"),
+        "cubicornio_url": Settings.CUBICORNIO_BASE_URL.rstrip("/"),
+    }
+
+
+def _build_context(with_submodules: bool = False) -> Dict[str, Any]:
+    """
+    Contexto común de las páginas.
+    ✅ Perfil, workspace seleccionado y (opcional) catálogo corren en paralelo con un
+    deadline por request; si alguno se pasa, la página sale con contexto parcial.
+
+    Si Cubicornio rechaza el access (401), el refresh se hace acá, en el thread del
+    request y con la session todavía sin guardar, y el fan-out se repite 1 vez.
+    """
+    access = _session_access()
+    fetched = _start_context(access, with_profile=True, with_submodules=with_submodules).result()
+
+    if access and _access_rejected(fetched):
+        try:
+            access = refresh_and_retry()
+        except _refresh_errors():
+            # Cubicornio caído durante el refresh: la página sale con el contexto parcial
+            current_app.logger.warning("Refresh tras 401 falló; se renderiza con contexto parcial")
+            access = None
+        if access:
+            fetched = _start_context(access, with_profile=True, with_submodules=with_submodules).result()
+
+    token = session.get("cubicornio_token")
+    return {**_base_context(token), **_resolve_context(token, fetched)}
+
+
+def _lazy_context(with_profile: bool = True, with_submodules: bool = False) -> Dict[str, Any]:
+    """
+    Como _build_context, pero sin esperar: las claves del upstream son proxies que
+    bloquean recién cuando el template las lee (el shell ya salió al navegador).
+
+    El token se valida (y refresca) antes: con streaming los headers y la cookie de
+    session se mandan antes del body, así que ningún refresh puede quedar para después.
+    Un 401 del perfil durante el stream no refresca (la session ya se guardó): el access
+    queda marcado como rechazado y el próximo request lo refresca antes del 1er byte.
+    """
+    access = _session_access()
+    token = session.get("cubicornio_token")
+
+    call = _start_context(access, with_profile=with_profile, with_submodules=with_submodules)
+    resolved: Dict[str, Dict[str, Any]] = {}
+
+    def _get(key: str) -> Any:
+        if "ctx" not in resolved:
+            resolved["ctx"] = _resolve_context(token, call.result())
+        return resolved["ctx"][key]
+
+    ctx = _base_context(token)
+    for key in _DEFERRED_KEYS:
+        ctx[key] = LocalProxy(lambda key=key: _get(key))
+    return ctx
+
+
+def _buffered(chunks: Iterator[str], size: int) -> Iterator[str]:
+    """
+    Agrupa los fragmentos de Jinja (1 por nodo) para no hacer 1 write por cada uno.
+    Como mucho size-1 fragmentos quedan retenidos mientras un proxy espera al upstream.
+    """
+    buf: List[str] = []
+    for chunk in chunks:
+        buf.append(chunk)
+        if len(buf) >= size:
+            yield "".join(buf)
+            buf.clear()
+    if buf:
+        yield "".join(buf)
+
+
+def _render_page(template: str, with_profile: bool = True, with_submodules: bool = False) -> Response:
+    """
+    ✅ Streaming: <head>, CSS y sidebar salen enseguida (el navegador ya pide assets) y
+    los bloques de usuario/empresa se escriben cuando resuelve el perfil.
+    """
+    if not Settings.STREAM_PAGES:
+        return make_response(render_template(template, **_build_context(with_submodules=with_submodules)))
+
+    ctx = _lazy_context(with_profile=with_profile, with_submodules=with_submodules)
+    body = _buffered(stream_template(template, **ctx), STREAM_FLUSH_CHUNKS)
+    resp = current_app.response_class(body, mimetype="text/html")
+    # que proxies (nginx) no junten todo el body antes de mandarlo
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+
 @main_bp.route("/")
 def home():
     # landing igual, solo con sidebar en el template
-    return render_template("home.html", **_build_context())
+    return _render_page("home.html")
 
 
 @main_bp.route("/submodules")
 def submodules():
-    # nueva pantalla (sidebar -> link)
-    return render_template("submodules.html", **_build_context())
+    # nueva pantalla (sidebar -> link); el template no muestra datos del perfil
+    return _render_page("submodules.html", with_profile=False)
 
 
 @main_bp.route("/guidelines")
 def guidelines():
-    ctx = _build_context()
-    ctx["guidelines"] = get_submodule_guidelines()
-    return render_template("submodule_guidelines.html", **ctx)
+    """
+    ✅ Cuerpo pre-renderizado (services/guidelines_page.py) + ETag fuerte: solo el
+    sidebar (OAuth sí/no) se renderiza por request; sin perfil ni fan-out.
+    """
+    token = session.get("cubicornio_token")
+    etag = guidelines_page.etag(authenticated=bool(token))
+
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+    else:
+        resp = make_response(render_template(
+            "submodule_guidelines.html",
+            token=token,
+            guidelines_body=guidelines_page.body(),
+        ))
+
+    resp.set_etag(etag)
+    # depende de la cookie de sesión: no compartir en caches intermedios, revalidar siempre
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Cookie")
+    return resp
@@ -0,0 +1,20 @@
+# routes/metrics.py
+from __future__ import annotations
+
+from flask import Blueprint, Response, abort
+
+from services.metrics import metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics_bp.get("/metrics")
+def prometheus_metrics():
+    """
+    Métricas de todos los workers (ver services/metrics.py), en formato texto de Prometheus.
+    """
+    if not metrics.enabled:
+        abort(404)
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
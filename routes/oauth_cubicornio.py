@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 import secrets
+import time
+from typing import Any, Dict
 from urllib.parse import urlencode
 
 from flask import (
@@ -13,7 +15,10 @@ from flask import (
     current_app,
 )
 
-from oauth_client import oauth
+from config import Settings
+from oauth_client import get_cubicornio_client
+from services.cubicornio_oauth import clear_session_token
+from services.session_store import regenerate_session
 
 
 cubicornio_auth_bp = Blueprint(
@@ -23,21 +28,49 @@ cubicornio_auth_bp = Blueprint(
 )
 
 
+def _live_states(state_map: Any) -> Dict[str, Dict[str, Any]]:
+    """
+    Deja solo los states vigentes (TTL) y como mucho OAUTH_STATE_MAX_ENTRIES,
+    conservando los más recientes. Así la session no crece con cada /login abandonado.
+    """
+    if not isinstance(state_map, dict):
+        return {}
+
+    now = time.time()
+    live = {
+        state: entry
+        for state, entry in state_map.items()
+        if isinstance(entry, dict) and now - float(entry.get("ts") or 0) < Settings.OAUTH_STATE_TTL_SECONDS
+    }
+    newest = sorted(live.items(), key=lambda kv: kv[1]["ts"], reverse=True)
+    return dict(newest[: Settings.OAUTH_STATE_MAX_ENTRIES])
+
+
+def _prune_authlib_states(live: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Authlib guarda su propio `_state_cubicornio_<state>` por cada login;
+    descartamos los que ya no tienen un state vigente en nuestro mapa.
+    """
+    prefix = "_state_cubicornio_"
+    for key in [k for k in session.keys() if k.startswith(prefix)]:
+        if key[len(prefix):] not in live:
+            session.pop(key, None)
+
+
 def _pop_next_for_state(state: str | None, default_url: str) -> str:
     """
     Recupera la URL 'next' asociada a un state concreto.
-    Si no existe o no hay state, devuelve default_url.
+    Si no existe, expiró o no hay state, devuelve default_url.
     """
     if not state:
         return default_url
 
-    state_map = session.get("cubi_oauth_states")
-    if not isinstance(state_map, dict):
-        state_map = {}
-
-    next_url = state_map.pop(state, default_url)
+    state_map = _live_states(session.get("cubi_oauth_states"))
+    entry = state_map.pop(state, None)
     session["cubi_oauth_states"] = state_map
-    return next_url
+    if not entry:
+        return default_url
+    return entry.get("next") or default_url
 
 
 @cubicornio_auth_bp.route("/login")
@@ -57,21 +90,20 @@ def login():
     # state único por flujo
     state = secrets.token_urlsafe(16)
 
-    state_map = session.get("cubi_oauth_states")
-    if not isinstance(state_map, dict):
-        state_map = {}
-
-    state_map[state] = next_url
-    session["cubi_oauth_states"] = state_map
+    state_map = _live_states(session.get("cubi_oauth_states"))
+    state_map[state] = {"next": next_url, "ts": time.time()}
+    session["cubi_oauth_states"] = _live_states(state_map)
 
     redirect_uri = url_for("cubicornio_auth.callback", _external=True)
     # IMPORTANTE: este redirect_uri debe coincidir EXACTAMENTE
     # con el que registres en Cubicornio
 
-    return oauth.cubicornio.authorize_redirect(
+    resp = get_cubicornio_client().authorize_redirect(
         redirect_uri,
         state=state,
     )
+    _prune_authlib_states(session["cubi_oauth_states"])
+    return resp
 
 
 @cubicornio_auth_bp.route("/callback")
@@ -96,13 +128,16 @@ def callback():
 
     # Intercambio code -> token (Authlib valida automáticamente el `state` interno)
     try:
-        token = oauth.cubicornio.authorize_access_token()
+        token = get_cubicornio_client().authorize_access_token()
     except Exception as exc:  # noqa: BLE001
         current_app.logger.exception("Error durante el intercambio code -> token")
         qs = urlencode({"oauth_error": "exchange_failed"})
         sep = "&" if "?" in next_url else "?"
         return redirect(f"{next_url}{sep}{qs}")
 
+    # sid nuevo al loguearse: el que tenía el navegador antes del login no sirve más
+    regenerate_session()
+
     # Guardamos token completo en sesión (access_token, refresh_token, etc.)
     session["cubicornio_token"] = token
 
@@ -114,5 +149,5 @@ def logout():
     """
     Limpia sólo la sesión local del bundle (no cierra sesión global en Cubicornio).
     """
-    session.pop("cubicornio_token", None)
+    clear_session_token()
     return redirect(url_for("main.home"))
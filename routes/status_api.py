@@ -0,0 +1,38 @@
+# routes/status_api.py
+from __future__ import annotations
+
+from flask import Blueprint, current_app, jsonify
+
+from services.circuit_breaker import cubicornio_breaker
+from services.module_loader import get_module_loader
+from services.profile_cache import profile_cache
+from services.response_cache import upstream_cache
+
+status_api_bp = Blueprint("status_api", __name__, url_prefix="/api/status")
+
+
+@status_api_bp.get("/cubicornio")
+def cubicornio_status():
+    """
+    Estado del upstream visto desde este worker: circuit breaker + caches.
+    """
+    breaker = cubicornio_breaker.snapshot()
+    return jsonify({
+        "ok": breaker["state"] != "open",
+        "breaker": breaker,
+        "profile_cache": profile_cache.stats(),
+        "upstream_cache": upstream_cache.stats(),
+    }), 200
+
+
+@status_api_bp.get("/modules")
+def modules_status():
+    """
+    Submódulos montados por el loader: url_prefix, si ya se importaron y cuánto tardó
+    (+ resultado del warm-up de templates, si corrió).
+    """
+    return jsonify({
+        "ok": True,
+        **get_module_loader().status(),
+        "templates": current_app.extensions.get("template_warmup"),
+    }), 200
@@ -2,23 +2,23 @@
 from __future__ import annotations
 
 import os
-from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-from flask import Blueprint, jsonify, request, session, current_app
+from flask import Blueprint, jsonify, request, session, current_app, url_for
 
-from services.submodule_workspace import SubmoduleWorkspaceService, WorkspaceError
-from services.cubicornio_oauth import get_valid_access_token, refresh_and_retry
+from config import Settings
+from services.submodule_workspace import SubmoduleWorkspaceService, WorkspaceError, get_workspace
+from services.cubicornio_client import SUBMODULE_INIT_PATH_TPL, SUBMODULES_LIST_PATH
+from services.circuit_breaker import CircuitOpenError
+from services.cubicornio_oauth import ACCESS_REJECTED, CubicornioAuthError, get_valid_access_token, refresh_and_retry
+from services.fanout import FanOut, FanOutResult
+from services.response_cache import upstream_cache
+from services.workspace_jobs import POLL_AFTER_MS, workspace_jobs
 
 workspace_api_bp = Blueprint("workspace_api", __name__, url_prefix="/api")
 
-# SOLO esto en .env
-CUBICORNIO_BASE_URL =  "https://cubicornio.com"
-
-#  Convención fija (no env)
-CUBI_LIST_PATH = "/api/v1/submodules"
-CUBI_INIT_PATH_TPL = "/api/v1/submodules/{id}/init"
+# Pool acotado para /submodules/init:batch
+_batch_fanout = FanOut(Settings.INIT_BATCH_WORKERS, thread_name_prefix="init-batch")
 
 
 def _extract_access_token(token_obj: Any) -> Optional[str]:
@@ -35,13 +35,7 @@ def _extract_access_token(token_obj: Any) -> Optional[str]:
 
 
 def _svc() -> SubmoduleWorkspaceService:
-    return SubmoduleWorkspaceService(project_root=Path.cwd())
-
-
-def _cubi_get(path: str, access: str):
-    url = f"{CUBICORNIO_BASE_URL}{path}"
-    headers = {"Authorization": f"Bearer {access}", "Accept": "application/json"}
-    return requests.get(url, headers=headers, timeout=10)
+    return get_workspace()
 
 
 @workspace_api_bp.get("/workspace/selected")
@@ -51,10 +45,20 @@ def workspace_selected():
 
 @workspace_api_bp.post("/workspace/init")
 def workspace_init():
+    """
+    ✅ Async: valida en el request (4xx directo) y encola solo el scaffold; responde 202
+    con el job y el avance se consulta en GET /api/workspace/jobs/<id> (no bloquea un
+    worker mientras corre bash/git).
+    """
     try:
         payload: Dict[str, Any] = request.get_json(force=True) or {}
-        selected = _svc().init_submodule(payload)
-        return jsonify({"ok": True, "selected": selected}), 200
+        if not isinstance(payload, dict):
+            return jsonify({"ok": False, "error": "Envía un objeto JSON"}), 400
+        job = workspace_jobs.submit_init(_svc(), payload)
+        resp = jsonify({"ok": True, "job": job, "poll_after_ms": POLL_AFTER_MS})
+        resp.status_code = 202
+        resp.headers["Location"] = url_for("workspace_api.workspace_job", job_id=job["id"])
+        return resp
     except WorkspaceError as e:
         return jsonify({"ok": False, "error": e.message}), e.status_code
     except Exception:
@@ -62,11 +66,22 @@ def workspace_init():
         return jsonify({"ok": False, "error": "Error interno"}), 500
 
 
+@workspace_api_bp.get("/workspace/jobs/<job_id>")
+def workspace_job(job_id: str):
+    job = workspace_jobs.get(job_id)
+    if job is None:
+        return jsonify({"ok": False, "error": "Job no encontrado"}), 404
+    resp = jsonify({"ok": True, "job": job, "poll_after_ms": POLL_AFTER_MS})
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
 @workspace_api_bp.post("/workspace/delete")
 def workspace_delete():
     try:
-        _svc().delete_selected()
-        return jsonify({"ok": True}), 200
+        svc = _svc()
+        svc.delete_selected()
+        return jsonify({"ok": True, "trash": svc.trash.stats()}), 200
     except WorkspaceError as e:
         return jsonify({"ok": False, "error": e.message}), e.status_code
     except Exception:
@@ -74,67 +89,182 @@ def workspace_delete():
         return jsonify({"ok": False, "error": "Error interno"}), 500
 
 
+@workspace_api_bp.get("/workspace/trash")
+def workspace_trash():
+    """
+    Estado del purge en background de workspaces borrados.
+    """
+    return jsonify({"ok": True, "trash": _svc().trash.stats()}), 200
+
+
+
+def _conditional_json(body: Dict[str, Any]):
+    """
+    200 con ETag propio (hash del body); si el browser ya lo tiene, 304 sin body.
+    """
+    resp = jsonify(body)
+    resp.add_etag()
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp.make_conditional(request)
+
+
+def _unavailable(extra: Dict[str, Any], retry_after: float):
+    """
+    Circuito abierto y sin copia en cache: 503 inmediato con Retry-After.
+    """
+    resp = jsonify({"ok": False, "error": "cubicornio_unavailable", **extra})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(max(1, int(retry_after)))
+    return resp
+
 
 @workspace_api_bp.get("/submodules/list")
 def list_submodules():
-    access, _ = get_valid_access_token()
-    if not access:
-        return jsonify({"ok": False, "error": "oauth_not_connected", "items": []}), 401
-
     try:
-        resp = _cubi_get(CUBI_LIST_PATH, access)
+        result = upstream_cache.get_json(SUBMODULES_LIST_PATH)
 
-        # fallback 401 -> refresh -> retry
-        if resp.status_code == 401:
-            new_access = refresh_and_retry()
-            if not new_access:
-                return jsonify({"ok": False, "error": "oauth_expired_relogin", "items": []}), 401
-            resp = _cubi_get(CUBI_LIST_PATH, new_access)
-
-        if not resp.ok:
+        if not result.ok:
             return jsonify({
                 "ok": False,
-                "error": f"API Cubicornio respondió {resp.status_code}: {resp.text[:200]}",
+                "error": f"API Cubicornio respondió {result.status_code}: {result.text[:200]}",
                 "items": []
             }), 502
 
-        data = resp.json() or {}
+        data = result.data or {}
         items = data.get("submodules") or data.get("items") or []
-        return jsonify({"ok": True, "items": items}), 200
+        return _conditional_json({"ok": True, "items": items})
 
+    except CubicornioAuthError as e:
+        return jsonify({"ok": False, "error": e.message, "items": []}), e.status_code
+    except CircuitOpenError as e:
+        return _unavailable({"items": []}, e.retry_after)
     except Exception:
         current_app.logger.exception("list_submodules failed")
         return jsonify({"ok": False, "error": "Error consultando Cubicornio API", "items": []}), 502
 
 
-@workspace_api_bp.get("/submodules/<int:sid>/init")
-def init_submodule_payload(sid: int):
-    access, _ = get_valid_access_token()
-    if not access:
-        return jsonify({"ok": False, "error": "oauth_not_connected"}), 401
-
-    path = CUBI_INIT_PATH_TPL.format(id=sid)
+def _fetch_init_payload(sid: int, access: Optional[str] = None) -> Tuple[Dict[str, Any], int]:
+    """
+    Lógica compartida por /init y /init:batch: cache + ETag upstream + refresh 401.
+    Nunca lanza: devuelve (body, status). Con `access` (tareas del batch) no toca la
+    session: un 401 vuelve como error ACCESS_REJECTED y el refresh lo hace el request.
+    """
+    path = SUBMODULE_INIT_PATH_TPL.format(id=sid)
 
     try:
-        resp = _cubi_get(path, access)
-
-        # fallback 401 -> refresh -> retry
-        if resp.status_code == 401:
-            new_access = refresh_and_retry()
-            if not new_access:
-                return jsonify({"ok": False, "error": "oauth_expired_relogin"}), 401
-            resp = _cubi_get(path, new_access)
+        result = upstream_cache.get_json(path, access=access)
 
-        if not resp.ok:
-            return jsonify({"ok": False, "error": f"API Cubicornio respondió {resp.status_code}: {resp.text[:200]}"}), 502
+        if not result.ok:
+            return {"ok": False, "error": f"API Cubicornio respondió {result.status_code}: {result.text[:200]}"}, 502
 
-        data = resp.json() or {}
+        data = result.data or {}
         payload = data.get("payload")
         if not payload:
-            return jsonify({"ok": False, "error": "Payload inválido desde Cubicornio"}), 502
+            return {"ok": False, "error": "Payload inválido desde Cubicornio"}, 502
 
-        return jsonify({"ok": True, "payload": payload}), 200
+        return {"ok": True, "payload": payload}, 200
 
+    except CubicornioAuthError as e:
+        return {"ok": False, "error": e.message}, e.status_code
+    except CircuitOpenError as e:
+        return {"ok": False, "error": "cubicornio_unavailable", "retry_after": max(1, int(e.retry_after))}, 503
     except Exception:
-        current_app.logger.exception("init_submodule_payload failed")
-        return jsonify({"ok": False, "error": "Error consultando Cubicornio API"}), 502
+        current_app.logger.exception("init_submodule_payload failed (id=%s)", sid)
+        return {"ok": False, "error": "Error consultando Cubicornio API"}, 502
+
+
+@workspace_api_bp.get("/submodules/<int:sid>/init")
+def init_submodule_payload(sid: int):
+    body, status = _fetch_init_payload(sid)
+    if status == 200:
+        return _conditional_json(body)
+    if status == 503:
+        return _unavailable({}, body["retry_after"])
+    return jsonify(body), status
+
+
+@workspace_api_bp.post("/submodules/init:batch")
+def init_submodule_payload_batch():
+    """
+    Payloads de varios submódulos en 1 request.
+    Body: {"ids": [1, 2, 3]} → ids repetidos se piden una sola vez y en paralelo
+    (pool acotado). Cada id trae su propio ok/error.
+    """
+    body: Dict[str, Any] = request.get_json(silent=True) or {}
+    raw_ids = body.get("ids")
+    if not isinstance(raw_ids, list) or not raw_ids:
+        return jsonify({"ok": False, "error": "Envía {\"ids\": [..]} con al menos un id"}), 400
+
+    ids: List[int] = []
+    seen = set()
+    for raw in raw_ids:
+        if isinstance(raw, bool) or not isinstance(raw, (int, str)) or not str(raw).isdecimal():
+            return jsonify({"ok": False, "error": f"id inválido: {raw!r}"}), 400
+        sid = int(raw)
+        if sid not in seen:
+            seen.add(sid)
+            ids.append(sid)
+
+    if len(ids) > Settings.INIT_BATCH_MAX_IDS:
+        return jsonify({"ok": False, "error": f"Máximo {Settings.INIT_BATCH_MAX_IDS} ids por batch"}), 400
+
+    # Resolver el token 1 vez antes del fan-out (si hay refresh proactivo ocurre acá):
+    # las tareas solo reciben el access y nunca escriben la session.
+    try:
+        access, _ = get_valid_access_token()
+    except CircuitOpenError as e:
+        return _unavailable({"items": []}, e.retry_after)
+    if not access:
+        return jsonify({"ok": False, "error": "oauth_not_connected", "items": []}), 401
+
+    def _run(batch_ids: List[int], access: str) -> FanOutResult:
+        return _batch_fanout.run(
+            {str(sid): (lambda sid=sid: _fetch_init_payload(sid, access)) for sid in batch_ids},
+            deadline_seconds=Settings.INIT_BATCH_DEADLINE_SECONDS,
+        )
+
+    fetched = _run(ids, access)
+
+    # 401 dentro del batch: refresh single-flight acá y reintento (1 vez) de esos ids
+    rejected: List[int] = []
+    for sid in ids:
+        outcome = fetched.values.get(str(sid))
+        if outcome is not None and outcome[0].get("error") == ACCESS_REJECTED:
+            rejected.append(sid)
+
+    if rejected:
+        import requests
+
+        failure: Optional[Tuple[Dict[str, Any], int]] = None
+        try:
+            access = refresh_and_retry()
+        except CircuitOpenError as e:
+            # mismo resultado por id que _fetch_init_payload con el circuito abierto
+            failure = {"ok": False, "error": "cubicornio_unavailable", "retry_after": max(1, int(e.retry_after))}, 503
+        except requests.RequestException:
+            current_app.logger.exception("init:batch: refresh tras 401 falló")
+            failure = {"ok": False, "error": "Error consultando Cubicornio API"}, 502
+        else:
+            if not access:
+                failure = {"ok": False, "error": "oauth_expired_relogin"}, 401
+
+        if failure is None:
+            retried = _run(rejected, access)
+            fetched.values.update(retried.values)
+            fetched.timed_out.extend(retried.timed_out)
+        else:
+            for sid in rejected:
+                fetched.values[str(sid)] = (dict(failure[0]), failure[1])
+
+    items: List[Dict[str, Any]] = []
+    for sid in ids:
+        outcome = fetched.values.get(str(sid))
+        if outcome is None:
+            error = "timeout" if str(sid) in fetched.timed_out else "Error interno"
+            items.append({"id": sid, "ok": False, "status": 504 if error == "timeout" else 500, "error": error})
+            continue
+        item_body, item_status = outcome
+        items.append({"id": sid, "status": item_status, **item_body})
+
+    failed = sum(1 for it in items if not it["ok"])
+    return jsonify({"ok": failed == 0, "failed": failed, "items": items}), 200
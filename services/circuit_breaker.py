@@ -0,0 +1,169 @@
+# services/circuit_breaker.py
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from config import Settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _percentile_ms(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(len(sorted_values) * q))
+    return round(sorted_values[idx] * 1000, 1)
+
+
+@dataclass
+class CircuitOpenError(Exception):
+    message: str
+    retry_after: float = 0.0
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de error + latencia en una ventana deslizante.
+
+    - closed: todo pasa; si en la ventana hay >= min_calls y la proporción de
+      fallos (errores de red, 5xx o llamadas más lentas que slow_call_seconds)
+      llega a failure_rate_threshold, abre.
+    - open: falla rápido (CircuitOpenError) durante open_seconds.
+    - half_open: deja pasar hasta half_open_max_calls probes; si todos salen bien
+      cierra, si alguno falla vuelve a abrir.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float,
+        min_calls: int,
+        failure_rate_threshold: float,
+        slow_call_seconds: float,
+        open_seconds: float,
+        half_open_max_calls: int,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._calls: Deque[Tuple[float, bool, float]] = deque()  # (ts, failed, latency)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.times_opened += 1
+
+    # -----------------------
+    # API
+    # -----------------------
+    def allow(self) -> bool:
+        """
+        Pide permiso para una llamada. Devuelve True si la llamada es un probe de
+        half-open (hay que pasarlo a record). Lanza CircuitOpenError si está abierto.
+        """
+        now = time.time()
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self.open_seconds - (now - self._opened_at)
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuito '{self.name}' abierto", retry_after=remaining)
+                self._state = HALF_OPEN
+
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuito '{self.name}' en prueba (half-open)", retry_after=1.0)
+                self._probes_in_flight += 1
+                return True
+
+            return False
+
+    def record(self, success: bool, latency: float, probe: bool = False) -> None:
+        now = time.time()
+        failed = (not success) or latency > self.slow_call_seconds
+
+        with self._lock:
+            self._calls.append((now, failed, latency))
+            self._prune(now)
+
+            if probe and self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_max_calls:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+
+            if self._state != CLOSED or len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            if failures / len(self._calls) >= self.failure_rate_threshold:
+                self._open(now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            calls = list(self._calls)
+            state = self._state
+            if state == OPEN and now - self._opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            retry_after = max(0.0, self.open_seconds - (now - self._opened_at)) if state == OPEN else 0.0
+
+            latencies = sorted(lat for _, _, lat in calls)
+            failures = sum(1 for _, f, _ in calls if f)
+            return {
+                "name": self.name,
+                "state": state,
+                "retry_after_seconds": round(retry_after, 2),
+                "window_seconds": self.window_seconds,
+                "calls_in_window": len(calls),
+                "failure_rate": round(failures / len(calls), 3) if calls else 0.0,
+                "latency_p50_ms": _percentile_ms(latencies, 0.50),
+                "latency_p95_ms": _percentile_ms(latencies, 0.95),
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+
+cubicornio_breaker = CircuitBreaker(
+    name="cubicornio",
+    window_seconds=Settings.CUBICORNIO_BREAKER_WINDOW_SECONDS,
+    min_calls=Settings.CUBICORNIO_BREAKER_MIN_CALLS,
+    failure_rate_threshold=Settings.CUBICORNIO_BREAKER_FAILURE_RATE,
+    slow_call_seconds=Settings.CUBICORNIO_BREAKER_SLOW_CALL_SECONDS,
+    open_seconds=Settings.CUBICORNIO_BREAKER_OPEN_SECONDS,
+    half_open_max_calls=Settings.CUBICORNIO_BREAKER_HALF_OPEN_CALLS,
+)
@@ -0,0 +1,183 @@
+# services/cubicornio_client.py
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from config import Settings
+from services.circuit_breaker import cubicornio_breaker
+from services.metrics import UPSTREAM_SECONDS
+from services.request_timing import timed
+
+if TYPE_CHECKING:  # requests se importa con la 1ra llamada saliente (ver get_session)
+    import requests
+
+#  Convención fija de paths (relativos a Settings.CUBICORNIO_BASE_URL)
+PROFILE_PATH = "/dev/oauth/profile"
+SUBMODULES_LIST_PATH = "/api/v1/submodules"
+SUBMODULE_INIT_PATH_TPL = "/api/v1/submodules/{id}/init"
+
+# Respuestas transitorias que vale la pena reintentar en GETs (idempotentes)
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def api_url(path: str) -> str:
+    """
+    Arma la URL absoluta de Cubicornio.
+    Settings.CUBICORNIO_BASE_URL es la única fuente de verdad del host.
+    """
+    base = (Settings.CUBICORNIO_BASE_URL or "").rstrip("/")
+    return f"{base}/{path.lstrip('/')}"
+
+
+def get_session() -> requests.Session:
+    """
+    Session compartida por proceso (keep-alive + pool de conexiones).
+    requests.Session es thread-safe para requests concurrentes con un pool propio.
+    ✅ Import diferido: páginas que no hablan con Cubicornio no cargan requests.
+    """
+    global _session
+    if _session is not None:
+        return _session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=Settings.CUBICORNIO_HTTP_POOL_SIZE,
+                pool_maxsize=Settings.CUBICORNIO_HTTP_POOL_SIZE,
+                max_retries=0,  # los reintentos los controlamos nosotros (ver cubi_get)
+            )
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _session = s
+    return _session
+
+
+def _timeout(read_timeout: Optional[float]) -> Tuple[float, float]:
+    return (
+        Settings.CUBICORNIO_HTTP_CONNECT_TIMEOUT,
+        read_timeout if read_timeout is not None else Settings.CUBICORNIO_HTTP_READ_TIMEOUT,
+    )
+
+
+def _backoff_sleep(attempt: int) -> None:
+    # backoff exponencial con "full jitter" para no sincronizar reintentos entre workers
+    base = Settings.CUBICORNIO_HTTP_BACKOFF_SECONDS * (2 ** attempt)
+    time.sleep(random.uniform(0, base))
+
+
+def _headers(access: Optional[str], extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+    headers = {"Accept": "application/json"}
+    if access:
+        headers["Authorization"] = f"Bearer {access}"
+    if extra:
+        headers.update(extra)
+    return headers
+
+
+def _endpoint_label(url: str) -> str:
+    """
+    Label de métricas por endpoint lógico (nunca la URL: los ids del path disparan la cardinalidad).
+    """
+    if url == Settings.CUBICORNIO_OAUTH_TOKEN_URL:
+        return "token"
+    path = url.split("?", 1)[0].rstrip("/")
+    if path.endswith("/init"):
+        return "init"
+    if path.endswith(SUBMODULES_LIST_PATH):
+        return "submodules_list"
+    if path.endswith(PROFILE_PATH):
+        return "profile"
+    return "other"
+
+
+def _send(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """
+    Toda llamada saliente pasa por el circuit breaker: si Cubicornio está caído o
+    lento, fallamos rápido (CircuitOpenError) en vez de bloquear workers.
+    Errores de red y 5xx cuentan como fallo; 4xx es un upstream sano.
+    """
+    probe = cubicornio_breaker.allow()
+    t0 = time.perf_counter()
+    success = False
+    outcome = "error"
+    try:
+        resp = get_session().request(method, url, **kwargs)
+        success = resp.status_code < 500
+        outcome = f"{resp.status_code // 100}xx"
+        return resp
+    finally:
+        elapsed = time.perf_counter() - t0
+        cubicornio_breaker.record(success, elapsed, probe=probe)
+        UPSTREAM_SECONDS.observe(elapsed, endpoint=_endpoint_label(url), outcome=outcome)
+
+
+@timed("cubi_get")
+def cubi_get(
+    path: str,
+    access: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    read_timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+) -> requests.Response:
+    """
+    GET a Cubicornio usando el pool compartido.
+    ✅ Reintenta errores de conexión/timeout y 502/503/504 con backoff + jitter.
+    El último intento devuelve la respuesta (o propaga la excepción) tal cual.
+    Con el circuito abierto lanza CircuitOpenError sin reintentar.
+    `retries` pisa CUBICORNIO_HTTP_GET_RETRIES (llamadas con deadline propio).
+    """
+    import requests
+
+    url = api_url(path)
+    retries = max(0, Settings.CUBICORNIO_HTTP_GET_RETRIES if retries is None else retries)
+
+    for attempt in range(retries + 1):
+        last = attempt == retries
+        try:
+            resp = _send(
+                "GET",
+                url,
+                headers=_headers(access, headers),
+                timeout=_timeout(read_timeout),
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            if last:
+                raise
+            _backoff_sleep(attempt)
+            continue
+
+        if resp.status_code in RETRY_STATUSES and not last:
+            resp.close()
+            _backoff_sleep(attempt)
+            continue
+        return resp
+
+    raise AssertionError("unreachable")
+
+
+def cubi_post(
+    url: str,
+    data: Optional[Dict[str, Any]] = None,
+    read_timeout: Optional[float] = None,
+) -> requests.Response:
+    """
+    POST (no idempotente: sin reintentos) usando el pool compartido.
+    Recibe URL absoluta porque el token endpoint vive en su propia setting.
+    """
+    return _send(
+        "POST",
+        url,
+        data=data,
+        headers=_headers(None, None),
+        timeout=_timeout(read_timeout),
+    )
@@ -3,15 +3,35 @@ from __future__ import annotations
 
 import os
 import time
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
 
-import requests
 from flask import session, current_app
 
-CUBICORNIO_BASE_URL = "https://cubicornio.com"
+from config import Settings
+from services.cubicornio_client import cubi_get, cubi_post
+from services.metrics import TOKEN_REFRESHES, UNAUTHORIZED_RETRIES
+from services.profile_cache import profile_cache
+from services.request_timing import timed
+from services.token_refresh import token_refresher
 
+if TYPE_CHECKING:
+    import requests
 
-TOKEN_REFRESH_PATH = "/dev/oauth/token"  # ejemplo
+
+@dataclass
+class CubicornioAuthError(Exception):
+    """
+    El usuario no tiene token usable: `message` es el código que esperan los clientes
+    (oauth_not_connected / oauth_expired_relogin).
+    """
+    message: str
+    status_code: int = 401
+
+
+# 401 con un access pasado explícito (tareas del fan-out): el refresh queda para el
+# thread del request, que es el único que escribe la session
+ACCESS_REJECTED = "oauth_access_rejected"
 
 def _access(token_obj: Any) -> Optional[str]:
     if not token_obj:
@@ -39,12 +59,12 @@ def _is_expired(token_obj: Any, skew_seconds: int = 30) -> bool:
     except Exception:
         return False
 
+@timed("token_refresh")
 def _do_refresh(refresh_token: str) -> Optional[Dict[str, Any]]:
     # si tu OAuth provider requiere client_id/secret en refresh:
     client_id = os.getenv("CUBICORNIO_CLIENT_ID")
     client_secret = os.getenv("CUBICORNIO_CLIENT_SECRET")
 
-    url = f"{CUBICORNIO_BASE_URL}{TOKEN_REFRESH_PATH}"
     data = {
         "grant_type": "refresh_token",
         "refresh_token": refresh_token,
@@ -56,16 +76,31 @@ def _do_refresh(refresh_token: str) -> Optional[Dict[str, Any]]:
     if client_secret:
         data["client_secret"] = client_secret
 
-    r = requests.post(url, data=data, timeout=10)
+    try:
+        r = cubi_post(Settings.CUBICORNIO_OAUTH_TOKEN_URL, data=data)
+    except Exception:
+        TOKEN_REFRESHES.inc(result="error")
+        raise
     if not r.ok:
         current_app.logger.warning("refresh failed %s: %s", r.status_code, r.text[:200])
+        TOKEN_REFRESHES.inc(result="failed")
         return None
 
     tok = r.json() or {}
     if not tok.get("access_token"):
+        TOKEN_REFRESHES.inc(result="failed")
         return None
+    TOKEN_REFRESHES.inc(result="ok")
     return tok
 
+def clear_session_token() -> None:
+    """
+    Saca el token de la session y olvida el perfil cacheado con su access_token.
+    """
+    token = session.pop("cubicornio_token", None)
+    profile_cache.invalidate(_access(token))
+
+@timed("token")
 def get_valid_access_token() -> Tuple[Optional[str], bool]:
     """
     Devuelve (access_token, refreshed_bool)
@@ -76,16 +111,20 @@ def get_valid_access_token() -> Tuple[Optional[str], bool]:
     if not access:
         return None, False
 
-    # 1) refresh proactivo si expira por expires_at
-    if _is_expired(token):
+    # 1) refresh proactivo si expira por expires_at, o si Cubicornio ya lo rechazó (401)
+    #    en un request que no podía guardar la session (ver authorized_get)
+    if _is_expired(token) or token_refresher.is_rejected(access):
+        # el access viejo deja de servir: su perfil cacheado también
+        profile_cache.invalidate(access)
+
         ref = _refresh(token)
         if not ref:
-            session.pop("cubicornio_token", None)
+            clear_session_token()
             return None, False
 
-        new_tok = _do_refresh(ref)
+        new_tok = token_refresher.refresh(ref, _do_refresh)
         if not new_tok:
-            session.pop("cubicornio_token", None)
+            clear_session_token()
             return None, False
 
         session["cubicornio_token"] = new_tok
@@ -99,13 +138,57 @@ def refresh_and_retry() -> Optional[str]:
     Intenta refresh aunque expires_at no esté.
     """
     token = session.get("cubicornio_token")
+    # Cubicornio rechazó el access actual: el perfil cacheado con él ya no vale
+    profile_cache.invalidate(_access(token))
+
     ref = _refresh(token)
     if not ref:
-        session.pop("cubicornio_token", None)
+        clear_session_token()
         return None
-    new_tok = _do_refresh(ref)
+    new_tok = token_refresher.refresh(ref, _do_refresh)
     if not new_tok:
-        session.pop("cubicornio_token", None)
+        clear_session_token()
         return None
     session["cubicornio_token"] = new_tok
     return new_tok["access_token"]
+
+def authorized_get(
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    read_timeout: Optional[float] = None,
+    retries: Optional[int] = None,
+    access: Optional[str] = None,
+) -> Tuple[requests.Response, str]:
+    """
+    GET a Cubicornio con el token de la session.
+    ✅ Único lugar con el fallback 401 -> refresh -> retry (1 vez).
+    Devuelve (response, access_token_usado). Lanza CubicornioAuthError si no hay
+    token o si el refresh falla; los errores de red se propagan al caller.
+
+    Con `access` (tareas que corren fuera del thread del request) no se lee ni se
+    escribe la session: un 401 lanza CubicornioAuthError(ACCESS_REJECTED) sin refresh.
+    """
+    if access is None:
+        access, _ = get_valid_access_token()
+        if not access:
+            raise CubicornioAuthError("oauth_not_connected")
+        can_refresh = True
+    else:
+        can_refresh = False
+
+    resp = cubi_get(path, access, headers=headers, read_timeout=read_timeout, retries=retries)
+    if resp.status_code == 401:
+        if not can_refresh:
+            resp.close()
+            # si el caller no llega a refrescar (página en streaming), lo hace el próximo request
+            token_refresher.mark_rejected(access)
+            UNAUTHORIZED_RETRIES.inc(result="deferred")
+            raise CubicornioAuthError(ACCESS_REJECTED)
+        access = refresh_and_retry()
+        if not access:
+            UNAUTHORIZED_RETRIES.inc(result="relogin")
+            raise CubicornioAuthError("oauth_expired_relogin")
+        UNAUTHORIZED_RETRIES.inc(result="retried")
+        resp = cubi_get(path, access, headers=headers, read_timeout=read_timeout, retries=retries)
+
+    return resp, access
@@ -0,0 +1,245 @@
+# services/disk_cache.py
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import Settings
+
+
+@dataclass
+class DiskEntry:
+    value: Any
+    stored_at: float
+    expires_at: float
+    stale_until: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class DiskCache:
+    """
+    Cache persistente (SQLite) para respuestas de Cubicornio: sobrevive deploys y
+    reinicios del reloader, y se comparte entre workers.
+
+    - TTL por entrada (`expires_at`); pasado el TTL la entrada queda disponible como
+      stale-if-error hasta `stale_until`.
+    - Tamaño acotado en bytes: al pasarse se desalojan las menos usadas (accessed_at).
+    """
+
+    EVICT_CHECK_EVERY = 50
+    BUSY_TIMEOUT_SECONDS = 5
+    # granularidad de accessed_at: basta para el LRU y evita 1 escritura por lectura
+    TOUCH_INTERVAL_SECONDS = 60
+
+    def __init__(self, db_path: Path, max_bytes: int, stale_if_error_seconds: float) -> None:
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.stale_if_error_seconds = stale_if_error_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.db_path.exists():
+            # puede contener perfiles de usuario: solo legible por el dueño
+            os.close(os.open(self.db_path, os.O_CREAT | os.O_WRONLY, 0o600))
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " stale_until REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=self.BUSY_TIMEOUT_SECONDS)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------
+    # API
+    # -----------------------
+    def get(self, namespace: str, key: str) -> Optional[DiskEntry]:
+        """
+        Devuelve la entrada si todavía sirve (fresca o dentro de stale-if-error).
+        Best effort: un error de SQLite (db bloqueada, corrupta) se trata como miss.
+        """
+        try:
+            return self._get(namespace, key)
+        except sqlite3.Error:
+            return None
+
+    def _get(self, namespace: str, key: str) -> Optional[DiskEntry]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, stored_at, expires_at, stale_until, accessed_at FROM entries"
+            " WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None or row[3] <= now:
+            return None
+
+        if now - row[4] >= self.TOUCH_INTERVAL_SECONDS:
+            self._touch(conn, namespace, key, now)
+        try:
+            value = json.loads(row[0])
+        except ValueError:
+            return None
+        return DiskEntry(value=value, stored_at=row[1], expires_at=row[2], stale_until=row[3])
+
+    def _touch(self, conn: sqlite3.Connection, namespace: str, key: str, now: float) -> None:
+        """
+        Actualiza accessed_at (solo lo usa el LRU de evict) sin esperar locks:
+        si otro proceso está escribiendo, se saltea y se reintenta en la próxima lectura.
+        """
+        conn.execute("PRAGMA busy_timeout = 0")
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key),
+                )
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            conn.execute(f"PRAGMA busy_timeout = {int(self.BUSY_TIMEOUT_SECONDS * 1000)}")
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: float,
+        stored_at: Optional[float] = None,
+    ) -> None:
+        try:
+            self._set(namespace, key, value, ttl_seconds, stored_at)
+        except sqlite3.Error:
+            pass
+
+    def _set(
+        self,
+        namespace: str,
+        key: str,
+        value: Any,
+        ttl_seconds: float,
+        stored_at: Optional[float],
+    ) -> None:
+        raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        stored_at = stored_at if stored_at is not None else now
+        expires_at = stored_at + ttl_seconds
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (namespace, key, value, size, stored_at, expires_at, stale_until, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    namespace,
+                    key,
+                    raw,
+                    len(raw.encode("utf-8")),
+                    stored_at,
+                    expires_at,
+                    expires_at + self.stale_if_error_seconds,
+                    now,
+                ),
+            )
+
+        self._writes += 1
+        if self._writes % self.EVICT_CHECK_EVERY == 0:
+            self.evict()
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            with self._conn() as conn:
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error:
+            pass
+
+    def evict(self) -> int:
+        """
+        Borra lo vencido (más allá de stale-if-error) y, si aún se pasa de max_bytes,
+        las entradas menos usadas. Devuelve cuántas borró.
+        """
+        removed = 0
+        with self._conn() as conn:
+            removed += conn.execute("DELETE FROM entries WHERE stale_until <= ?", (time.time(),)).rowcount
+
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return removed
+
+            rows = conn.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+            for namespace, key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                total -= size
+                removed += 1
+        return removed
+
+    def purge(self, namespace: Optional[str] = None, expired_only: bool = False) -> int:
+        sql = "DELETE FROM entries WHERE 1 = 1"
+        params: List[Any] = []
+        if namespace:
+            sql += " AND namespace = ?"
+            params.append(namespace)
+        if expired_only:
+            sql += " AND expires_at <= ?"
+            params.append(time.time())
+        with self._conn() as conn:
+            removed = conn.execute(sql, params).rowcount
+        self._conn().execute("VACUUM")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        rows = self._conn().execute(
+            "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0),"
+            " SUM(CASE WHEN expires_at > ? THEN 1 ELSE 0 END)"
+            " FROM entries GROUP BY namespace ORDER BY namespace",
+            (now,),
+        ).fetchall()
+        namespaces = {
+            ns: {"entries": count, "bytes": size, "fresh": fresh or 0}
+            for ns, count, size, fresh in rows
+        }
+        return {
+            "path": str(self.db_path),
+            "max_bytes": self.max_bytes,
+            "bytes": sum(v["bytes"] for v in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+
+def open_disk_cache() -> DiskCache:
+    return DiskCache(
+        db_path=Path(Settings.DISK_CACHE_PATH),
+        max_bytes=Settings.DISK_CACHE_MAX_BYTES,
+        stale_if_error_seconds=Settings.DISK_CACHE_STALE_IF_ERROR_SECONDS,
+    )
+
+
+# Opcional: solo se usa si DISK_CACHE_ENABLED=true
+disk_cache: Optional[DiskCache] = open_disk_cache() if Settings.DISK_CACHE_ENABLED else None
@@ -0,0 +1,128 @@
+# services/fanout.py
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import copy_current_request_context, current_app, has_request_context
+
+
+@dataclass
+class FanOutResult:
+    values: Dict[str, Any]
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out or self.failed)
+
+
+class FanOut:
+    """
+    Ejecuta llamadas independientes en paralelo con un deadline común.
+
+    - Pool acotado y compartido por proceso (no crea threads por request).
+    - Si hay request context, cada tarea corre con una copia (request/current_app
+      disponibles). Las tareas NO escriben la session: una que se pase del deadline sigue
+      corriendo después de que la session se guardó y lo que escriba se pierde. El token
+      se resuelve (y refresca) antes en el thread del request y se pasa como string.
+    - Lo que no termine antes del deadline queda con su default: el caller degrada
+      con contexto parcial en vez de esperar a la llamada más lenta.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix=thread_name_prefix,
+        )
+
+    def start(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        deadline_seconds: float,
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> "FanOutCall":
+        """
+        Lanza las tareas y vuelve enseguida; FanOutCall.result() espera (hasta el deadline,
+        contado desde acá). Para renders en streaming que necesitan los datos más tarde.
+        """
+        timings: Dict[str, float] = {}
+
+        def _timed(name: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+            def runner() -> Any:
+                t0 = time.perf_counter()
+                try:
+                    return fn()
+                finally:
+                    timings[name] = round((time.perf_counter() - t0) * 1000, 2)
+
+            if has_request_context():
+                return copy_current_request_context(runner)
+            return runner
+
+        futures = {name: self._executor.submit(_timed(name, fn)) for name, fn in tasks.items()}
+        return FanOutCall(futures, timings, time.monotonic() + deadline_seconds, defaults or {})
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        deadline_seconds: float,
+        defaults: Optional[Dict[str, Any]] = None,
+    ) -> FanOutResult:
+        return self.start(tasks, deadline_seconds, defaults).result()
+
+
+class FanOutCall:
+    """
+    Tareas ya lanzadas por FanOut.start(); result() se calcula 1 sola vez.
+    """
+
+    def __init__(
+        self,
+        futures: Dict[str, "Future[Any]"],
+        timings: Dict[str, float],
+        deadline: float,
+        defaults: Dict[str, Any],
+    ) -> None:
+        self._futures = futures
+        self._timings = timings
+        self._deadline = deadline
+        self._defaults = defaults
+        self._result: Optional[FanOutResult] = None
+
+    def result(self) -> FanOutResult:
+        if self._result is not None:
+            return self._result
+
+        pending = set(self._futures.values())
+        while pending:
+            remaining = self._deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _, pending = wait(pending, timeout=remaining, return_when=FIRST_EXCEPTION)
+
+        result = FanOutResult(values={})
+        for name, fut in self._futures.items():
+            if not fut.done():
+                result.values[name] = self._defaults.get(name)
+                result.timed_out.append(name)
+                continue
+            exc = fut.exception()
+            if exc is not None:
+                if has_request_context():
+                    current_app.logger.error("fan-out '%s' failed", name, exc_info=exc)
+                result.values[name] = self._defaults.get(name)
+                result.failed.append(name)
+                result.errors[name] = exc
+                continue
+            result.values[name] = fut.result()
+
+        # snapshot: las tareas colgadas siguen corriendo y podrían escribir después
+        result.timings_ms = dict(self._timings)
+        self._result = result
+        return result
@@ -0,0 +1,51 @@
+# services/file_lock.py
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: sin lock entre procesos
+    fcntl = None  # type: ignore[assignment]
+
+
+class FileLockTimeout(Exception):
+    pass
+
+
+@contextmanager
+def file_lock(path: Path, timeout: Optional[float] = None) -> Iterator[None]:
+    """
+    Lock exclusivo entre procesos (gunicorn workers) basado en flock.
+
+    - timeout=None espera indefinidamente.
+    - Si expira el timeout lanza FileLockTimeout.
+    - En plataformas sin fcntl (Windows) degrada a no-op: el lock entre threads
+      sigue siendo responsabilidad del caller.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as fh:
+        if fcntl is None:
+            yield
+            return
+
+        if timeout is None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise FileLockTimeout(str(path))
+                    time.sleep(0.02)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,75 @@
+# services/git_cli.py
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from config import Settings
+
+# Transports aceptados para repo_url: https://, http://, ssh://, git://, file:///ruta/absoluta
+# y scp-like [user@]host:path. Se siguen rechazando ext:: (y cualquier otro transport remoto
+# con helper), rutas locales sin file://, hosts que empiezan con "-" y valores tipo
+# "--upload-pack=<cmd>".
+REPO_URL_SCHEMES = frozenset({"https", "http", "ssh", "git"})
+_SCP_LIKE_RE = re.compile(r"^(?:[A-Za-z0-9._-]+@)?[A-Za-z0-9][A-Za-z0-9.-]*:[A-Za-z0-9._~/-]+$")
+
+# Ramas: nada que git pueda leer como opción ni rangos/rutas raras
+_BRANCH_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._/-]*$")
+
+
+@dataclass
+class GitError(Exception):
+    message: str
+
+
+def run_git(args: List[str], cwd: Optional[Path] = None) -> subprocess.CompletedProcess:
+    """
+    Ejecuta git sin prompts y con timeout; los errores salen como GitError de 1 línea útil.
+    """
+    try:
+        return subprocess.run(
+            ["git", *args],
+            cwd=str(cwd) if cwd else None,
+            check=True,
+            capture_output=True,
+            text=True,
+            timeout=Settings.SCAFFOLD_GIT_TIMEOUT_SECONDS,
+            # sin prompts de credenciales: un repo privado sin acceso falla en vez de colgar el job
+            env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+        )
+    except FileNotFoundError:
+        raise GitError("git no está instalado en el servidor.")
+    except subprocess.TimeoutExpired:
+        raise GitError(f"git {args[0]} excedió {Settings.SCAFFOLD_GIT_TIMEOUT_SECONDS:g}s.")
+    except subprocess.CalledProcessError as e:
+        msg = (e.stderr or e.stdout or "").strip()[:600]
+        raise GitError(f"git {args[0]} falló: {msg}" if msg else f"git {args[0]} falló.")
+
+
+def is_safe_repo_url(url: str) -> bool:
+    """
+    True si repo_url es una URL de git que se puede pasar a clone/set-url.
+    file:// solo con ruta absoluta (repos locales, p. ej. en tests); sin host o localhost.
+    """
+    if not url or url.startswith("-") or any(c.isspace() or ord(c) < 32 for c in url):
+        return False
+    if "://" not in url:
+        # igual que git: sin "://" es scp-like (ssh), nunca una ruta local
+        return bool(_SCP_LIKE_RE.match(url))
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+    except ValueError:
+        return False
+    if parts.scheme == "file":
+        return host in (None, "localhost") and parts.path.startswith("/")
+    return parts.scheme in REPO_URL_SCHEMES and bool(host) and not host.startswith("-")
+
+
+def is_safe_branch(branch: str) -> bool:
+    return bool(_BRANCH_RE.match(branch or "")) and ".." not in branch and not branch.endswith((".lock", "/"))
@@ -0,0 +1,106 @@
+# services/guidelines_page.py
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+from flask import current_app, render_template
+from markupsafe import Markup
+
+from services.submodule_guidelines import frozen_submodule_guidelines
+
+BODY_TEMPLATE = "_partials/guidelines_body.html"
+PARTIALS_DIR = "_partials/guidelines"
+
+# Templates que arman la página alrededor del cuerpo: si cambian, cambia el ETag
+SHELL_TEMPLATES = ("submodule_guidelines.html", "base.html", "_partials/sidebar.html")
+
+Signature = Tuple[Tuple[str, int], ...]
+
+
+@dataclass(frozen=True)
+class _Rendered:
+    signature: Signature
+    body: Markup
+    digest: str
+
+
+def template_signature(templates_dir: Path) -> Signature:
+    """
+    (path, mtime_ns) del cuerpo, el shell y cada partial por id: cualquier cambio en
+    disco invalida el fragmento (y el ETag).
+    """
+    paths = [templates_dir / BODY_TEMPLATE, *(templates_dir / t for t in SHELL_TEMPLATES)]
+    try:
+        paths += sorted((templates_dir / PARTIALS_DIR).glob("*.html"))
+    except OSError:
+        pass
+
+    sig = []
+    for p in paths:
+        try:
+            sig.append((str(p), os.stat(p).st_mtime_ns))
+        except OSError:
+            sig.append((str(p), -1))
+    return tuple(sig)
+
+
+class GuidelinesPageCache:
+    """
+    Fragment cache del cuerpo de /guidelines.
+
+    - Datos (frozen_submodule_guidelines) + partials por id son estáticos: el cuerpo se
+      renderiza 1 vez por proceso y se guarda como Markup.
+    - Con jinja auto_reload (debug) se re-chequean mtimes en cada request; en producción
+      no se toca el disco.
+    - etag(): fuerte, derivado de los inputs (hash del cuerpo + si hay sesión OAuth, que es
+      lo único por-usuario que muestra el sidebar). Se puede responder 304 sin renderizar.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._rendered: Optional[_Rendered] = None
+
+    def _templates_dir(self) -> Path:
+        return Path(current_app.root_path) / (current_app.template_folder or "templates")
+
+    def _current(self) -> _Rendered:
+        rendered = self._rendered
+        if rendered is not None and not current_app.jinja_env.auto_reload:
+            return rendered
+
+        signature = template_signature(self._templates_dir())
+        if rendered is not None and rendered.signature == signature:
+            return rendered
+
+        with self._lock:
+            rendered = self._rendered
+            if rendered is None or rendered.signature != signature:
+                body = Markup(render_template(BODY_TEMPLATE, guidelines=frozen_submodule_guidelines()))
+                # contenido (no mtimes) para que todos los workers den el mismo ETag
+                digest = hashlib.sha256(body.encode("utf-8"))
+                for name in SHELL_TEMPLATES:
+                    try:
+                        digest.update((self._templates_dir() / name).read_bytes())
+                    except OSError:
+                        pass
+                rendered = _Rendered(signature=signature, body=body, digest=digest.hexdigest()[:32])
+                self._rendered = rendered
+        return rendered
+
+    def body(self) -> Markup:
+        return self._current().body
+
+    def etag(self, authenticated: bool) -> str:
+        return f"{self._current().digest}-{'auth' if authenticated else 'anon'}"
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._rendered = None
+
+
+guidelines_page = GuidelinesPageCache()
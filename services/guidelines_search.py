@@ -0,0 +1,230 @@
+# services/guidelines_search.py
+from __future__ import annotations
+
+import bisect
+import html
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask, current_app
+
+from services.submodule_guidelines import frozen_submodule_guidelines
+
+EXTENSION_KEY = "guidelines_search"
+
+PARTIALS_DIR = Path("_partials") / "guidelines"
+
+# Peso de cada campo en la frecuencia del término (title pesa más que el partial)
+FIELD_WEIGHTS = {"title": 3.0, "summary": 2.0, "bullets": 1.0, "partial": 1.0}
+
+# BM25 clásico
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Palabras vacías del español (ya sin acentos): no aportan al ranking
+STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los o para por que se sin su sus un una y".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_JINJA_RE = re.compile(r"\{#.*?#\}|\{%.*?%\}|\{\{.*?\}\}", re.S)
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.S | re.I)
+
+Signature = Tuple[Tuple[str, int], ...]
+
+
+def fold(text: str) -> str:
+    """
+    Minúsculas y sin acentos/diacríticos ("Configuración" → "configuracion", "ñ" → "n").
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(fold(text)) if t not in STOPWORDS]
+
+
+def _partial_text(raw: str) -> str:
+    return html.unescape(_TAG_RE.sub(" ", _JINJA_RE.sub(" ", raw)))
+
+
+def _partials_signature(partials_dir: Path) -> Signature:
+    try:
+        entries = sorted(partials_dir.glob("*.html"))
+    except OSError:
+        return ()
+    sig = []
+    for p in entries:
+        try:
+            sig.append((p.name, os.stat(p).st_mtime_ns))
+        except OSError:
+            pass
+    return tuple(sig)
+
+
+@dataclass
+class _Index:
+    signature: Signature
+    docs: List[Dict[str, Any]]
+    postings: Dict[str, List[Tuple[int, float]]]   # término → [(doc, tf ponderado)]
+    doc_len: List[float]
+    avg_len: float
+    vocabulary: List[str] = field(default_factory=list)  # ordenado: prefijos con bisect
+    build_ms: float = 0.0
+
+
+class GuidelinesSearchIndex:
+    """
+    Índice invertido (BM25) sobre las guías: title, summary, bullets y el texto de
+    templates/_partials/guidelines/<id>.html.
+
+    - Se arma 1 vez al arrancar; search() solo re-chequea mtimes de los partials (el
+      contenido de get_submodule_guidelines() es código: cambia con un reinicio).
+    - Texto normalizado sin acentos: "configuracion" encuentra "Configuración".
+    - El último término de la query se toma también como prefijo (búsqueda mientras se tipea).
+    """
+
+    def __init__(self, templates_dir: Path) -> None:
+        self.partials_dir = templates_dir / PARTIALS_DIR
+        self._lock = threading.Lock()
+        self._index: Optional[_Index] = None
+        self.builds = 0
+
+    # -----------------------
+    # Build
+    # -----------------------
+    def _read_partial(self, item_id: str) -> str:
+        try:
+            return _partial_text((self.partials_dir / f"{item_id}.html").read_text(encoding="utf-8"))
+        except OSError:
+            return ""
+
+    def _build(self, signature: Signature) -> _Index:
+        t0 = time.perf_counter()
+        docs: List[Dict[str, Any]] = []
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        doc_len: List[float] = []
+
+        for group in frozen_submodule_guidelines():
+            for item in group.get("items") or ():
+                item_id = str(item.get("id") or "")
+                if not item_id:
+                    continue
+                fields = {
+                    "title": str(item.get("title") or ""),
+                    "summary": str(item.get("summary") or ""),
+                    "bullets": " ".join(str(b) for b in item.get("bullets") or ()),
+                    "partial": self._read_partial(item_id),
+                }
+                tf: Counter = Counter()
+                for name, text in fields.items():
+                    for token in tokenize(text):
+                        tf[token] += FIELD_WEIGHTS[name]
+
+                doc = len(docs)
+                docs.append({
+                    "id": item_id,
+                    "title": fields["title"],
+                    "summary": fields["summary"],
+                    "group_id": group.get("group_id") or group.get("id"),
+                    "group_title": group.get("title"),
+                })
+                doc_len.append(sum(tf.values()))
+                for token, weight in tf.items():
+                    postings[token].append((doc, weight))
+
+        return _Index(
+            signature=signature,
+            docs=docs,
+            postings=dict(postings),
+            doc_len=doc_len,
+            avg_len=(sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+            vocabulary=sorted(postings),
+            build_ms=round((time.perf_counter() - t0) * 1000, 2),
+        )
+
+    def ensure(self) -> _Index:
+        """
+        Índice vigente; se rearma solo si cambió el mtime (o la lista) de los partials.
+        """
+        signature = _partials_signature(self.partials_dir)
+        index = self._index
+        if index is not None and index.signature == signature:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None or index.signature != signature:
+                index = self._build(signature)
+                self._index = index
+                self.builds += 1
+        return index
+
+    # -----------------------
+    # Query
+    # -----------------------
+    def _expand(self, index: _Index, terms: List[str]) -> List[str]:
+        if not terms:
+            return []
+        *head, last = terms
+        expanded = list(head)
+        if last in index.postings:
+            expanded.append(last)
+        if len(last) >= 2:
+            i = bisect.bisect_left(index.vocabulary, last)
+            while i < len(index.vocabulary) and index.vocabulary[i].startswith(last):
+                if index.vocabulary[i] != last:
+                    expanded.append(index.vocabulary[i])
+                i += 1
+        return expanded
+
+    def search(self, query: str, limit: int = 20) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        index = self.ensure()
+        terms = self._expand(index, list(dict.fromkeys(tokenize(query))))
+
+        n_docs = len(index.docs)
+        scores: Dict[int, float] = defaultdict(float)
+        for term in terms:
+            plist = index.postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5))
+            for doc, tf in plist:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * index.doc_len[doc] / (index.avg_len or 1.0))
+                scores[doc] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[: max(0, limit)]
+        return {
+            "results": [{**index.docs[doc], "score": round(score, 4)} for doc, score in ranked],
+            "total": len(scores),
+            "took_ms": round((time.perf_counter() - t0) * 1000, 3),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._index
+        return {
+            "docs": len(index.docs) if index else 0,
+            "terms": len(index.postings) if index else 0,
+            "build_ms": index.build_ms if index else None,
+            "builds": self.builds,
+        }
+
+
+def init_guidelines_search(app: Flask) -> GuidelinesSearchIndex:
+    index = GuidelinesSearchIndex(Path(app.root_path) / (app.template_folder or "templates"))
+    index.ensure()
+    app.extensions[EXTENSION_KEY] = index
+    return index
+
+
+def get_guidelines_search() -> GuidelinesSearchIndex:
+    return current_app.extensions[EXTENSION_KEY]
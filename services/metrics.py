@@ -0,0 +1,440 @@
+# services/metrics.py
+from __future__ import annotations
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from flask import Flask, g
+
+from config import Settings
+from services.file_lock import file_lock
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Buckets (segundos): llamadas HTTP al upstream y operaciones de workspace (git/scaffold)
+HTTP_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WORKSPACE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 15.0, 30.0, 60.0, 120.0)
+
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = ".metrics.lock"
+
+Labels = Tuple[Tuple[str, str], ...]
+Collector = Callable[[], Iterable[Tuple[str, Dict[str, str], float]]]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+def _proc_start(pid: int) -> Optional[str]:
+    """
+    Start time del proceso en ticks desde el boot (campo 22 de /proc/<pid>/stat).
+    None sin /proc (macOS) o si el proceso no existe.
+    """
+    try:
+        raw = Path(f"/proc/{pid}/stat").read_bytes()
+    except OSError:
+        return None
+    # el comm (campo 2) puede tener espacios o paréntesis: se corta en el último ")"
+    fields = raw[raw.rindex(b")") + 2:].split()
+    return fields[19].decode("ascii") if len(fields) > 19 else None
+
+
+def _process_token(pid: int) -> str:
+    # sin /proc: uuid por proceso (el pid reusado igual da otro archivo)
+    return _proc_start(pid) or f"u{uuid.uuid4().hex[:12]}"
+
+
+def _worker_alive(pid: int, token: str) -> bool:
+    """
+    Vivo = el pid existe Y es el mismo proceso que escribió el archivo (un pid reusado
+    tras un reinicio, p. ej. de contenedor con BUNDLE_CACHE_DIR persistente, no cuenta).
+    """
+    if not _pid_alive(pid):
+        return False
+    if token.isdigit():
+        return _proc_start(pid) == token
+    return True  # token uuid: no hay start time con qué comparar
+
+
+def _key(name: str, labels: Labels) -> str:
+    return name + "|" + json.dumps(labels, separators=(",", ":"))
+
+
+def _split_key(key: str) -> Tuple[str, Labels]:
+    name, _, raw = key.partition("|")
+    return name, tuple((k, v) for k, v in json.loads(raw))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Sequence[str]) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, labels: Dict[str, Any]) -> Labels:
+        return tuple((n, str(labels.get(n, ""))) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if self.registry.enabled:
+            self.registry._add("counters", _key(self.name, self._labels(labels)), amount)
+
+
+class Gauge(_Metric):
+    """
+    Suma de los workers vivos (los archivos de pids muertos se descartan).
+    """
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if self.registry.enabled:
+            self.registry._add("gauges", _key(self.name, self._labels(labels)), amount)
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]) -> None:
+        super().__init__(registry, name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if self.registry.enabled:
+            self.registry._observe(_key(self.name, self._labels(labels)), self.buckets, value)
+
+    def timed(self, **labels: Any) -> Callable[[F], F]:
+        """
+        Decorador: observa la duración con outcome="ok" / "error" (si hay label outcome).
+        """
+        def decorator(fn: F) -> F:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                t0 = time.perf_counter()
+                outcome = "error"
+                try:
+                    result = fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    self.observe(time.perf_counter() - t0, outcome=outcome, **labels)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+
+class MetricsRegistry:
+    """
+    Métricas estilo Prometheus compartidas entre workers de gunicorn, sin servicios externos.
+
+    - Cada proceso acumula en memoria y vuelca a <dir>/<pid>-<start>.json (tmp + rename)
+      cada flush_seconds y antes de cada lectura de /metrics. <start> es el start time del
+      proceso (o un uuid sin /proc): un pid reusado nunca pisa el archivo de otro.
+    - render() suma todos los archivos. Los de procesos muertos se fusionan en archive.json
+      (counters e histogramas siguen siendo monótonos) y se borran; sus gauges se descartan.
+    - Collectors: callbacks que devuelven contadores propios del proceso (ej. hits de los
+      caches) como valores absolutos; se leen en cada flush.
+    """
+
+    def __init__(self, directory: Path, enabled: bool, flush_seconds: float) -> None:
+        self.directory = directory
+        self.enabled = enabled
+        self.flush_seconds = max(0.5, flush_seconds)
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: List[Collector] = []
+
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            # gunicorn --preload: lo acumulado en el master no es del worker
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._file = f"{self._pid}-{_process_token(self._pid)}.json"
+        self._values: Dict[str, Dict[str, Any]] = {"counters": {}, "gauges": {}, "histograms": {}}
+        self._flusher: Optional[threading.Thread] = None
+
+    # -----------------------
+    # Definición
+    # -----------------------
+    def _register(self, metric: _Metric) -> Any:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(self, name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]) -> Histogram:
+        return self._register(Histogram(self, name, help_text, labelnames, buckets))
+
+    # -----------------------
+    # Escritura (en memoria)
+    # -----------------------
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._flusher.start()
+
+    def _add(self, kind: str, key: str, amount: float) -> None:
+        with self._lock:
+            values = self._values[kind]
+            values[key] = values.get(key, 0.0) + amount
+            self._ensure_flusher()
+
+    def _observe(self, key: str, buckets: Tuple[float, ...], value: float) -> None:
+        with self._lock:
+            data = self._values["histograms"].get(key)
+            if data is None:
+                # [conteo por bucket..., +Inf, sum]
+                data = self._values["histograms"][key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, upper in enumerate(buckets):
+                if value <= upper:
+                    data[i] += 1
+                    break
+            else:
+                data[len(buckets)] += 1
+            data[-1] += value
+            self._ensure_flusher()
+
+    # -----------------------
+    # Disco
+    # -----------------------
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {kind: dict(values) for kind, values in self._values.items()}
+            snap["histograms"] = {k: list(v) for k, v in snap["histograms"].items()}
+        collected: Dict[str, float] = {}
+        for collector in self.collectors:
+            try:
+                for name, labels, value in collector():
+                    metric = self.metrics.get(name)
+                    if metric is not None:
+                        collected[_key(name, metric._labels(labels))] = float(value)
+            except Exception:
+                pass
+        snap["counters"].update(collected)
+        return snap
+
+    def flush(self) -> None:
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / self._file
+        tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(self._snapshot()), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _flush_loop(self) -> None:
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _read(path: Path) -> Dict[str, Any]:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _merge(into: Dict[str, Any], data: Dict[str, Any], with_gauges: bool) -> None:
+        for kind in ("counters", "gauges") if with_gauges else ("counters",):
+            target = into.setdefault(kind, {})
+            for key, value in (data.get(kind) or {}).items():
+                target[key] = target.get(key, 0.0) + value
+        target = into.setdefault("histograms", {})
+        for key, values in (data.get("histograms") or {}).items():
+            current = target.get(key)
+            target[key] = list(values) if current is None or len(current) != len(values) else [
+                a + b for a, b in zip(current, values)
+            ]
+
+    def aggregate(self) -> Dict[str, Any]:
+        self.flush()
+        archive_path = self.directory / ARCHIVE_FILE
+        total: Dict[str, Any] = {"counters": {}, "gauges": {}, "histograms": {}}
+
+        with file_lock(self.directory / LOCK_FILE):
+            archive = self._read(archive_path)
+            dead: List[Path] = []
+            for path in sorted(self.directory.glob("*.json")):
+                if path.name == ARCHIVE_FILE:
+                    continue
+                pid_part, _, token = path.stem.partition("-")
+                if not pid_part.isdigit():
+                    continue
+                data = self._read(path)
+                # <pid>.json (formato viejo, sin token): de un proceso anterior al deploy
+                alive = path.name == self._file or (bool(token) and _worker_alive(int(pid_part), token))
+                if not alive:
+                    self._merge(archive, data, with_gauges=False)
+                    dead.append(path)
+                    continue
+                self._merge(total, data, with_gauges=True)
+
+            if dead:
+                tmp = archive_path.with_name(f".{archive_path.name}.{uuid.uuid4().hex}.tmp")
+                tmp.write_text(json.dumps(archive), encoding="utf-8")
+                os.replace(tmp, archive_path)
+                for path in dead:
+                    path.unlink(missing_ok=True)
+
+        self._merge(total, archive, with_gauges=False)
+        return total
+
+    # -----------------------
+    # Exposición (text format 0.0.4)
+    # -----------------------
+    def render(self) -> str:
+        total = self.aggregate()
+        by_metric: Dict[str, List[Tuple[str, Labels, Any]]] = {}
+        for kind in ("counters", "gauges", "histograms"):
+            for key, value in total.get(kind, {}).items():
+                name, labels = _split_key(key)
+                by_metric.setdefault(name, []).append((kind, labels, value))
+
+        lines: List[str] = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for _, labels, value in sorted(by_metric.get(name, []), key=lambda e: e[1]):
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for upper, count in zip((*metric.buckets, float("inf")), value[:-1]):
+                        cumulative += count
+                        le = "+Inf" if upper == float("inf") else _fmt_value(upper)
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, ('le', le))} {cumulative}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_value(round(value[-1], 6))}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(
+    Path(Settings.METRICS_DIR),
+    enabled=Settings.METRICS_ENABLED,
+    flush_seconds=Settings.METRICS_FLUSH_SECONDS,
+)
+
+# -----------------------
+# Métricas del bundle
+# -----------------------
+UPSTREAM_SECONDS = metrics.histogram(
+    "bundle_upstream_request_seconds",
+    "Duración de llamadas HTTP a Cubicornio (cada intento).",
+    ("endpoint", "outcome"),
+    HTTP_BUCKETS,
+)
+TOKEN_REFRESHES = metrics.counter(
+    "bundle_token_refresh_total",
+    "Refresh de tokens OAuth contra Cubicornio.",
+    ("result",),
+)
+UNAUTHORIZED_RETRIES = metrics.counter(
+    "bundle_upstream_401_retries_total",
+    "Respuestas 401 que dispararon refresh + retry.",
+    ("result",),
+)
+WORKSPACE_SECONDS = metrics.histogram(
+    "bundle_workspace_operation_seconds",
+    "Duración de init / delete de workspaces.",
+    ("operation", "outcome"),
+    WORKSPACE_BUCKETS,
+)
+SCAFFOLD_FAILURES = metrics.counter(
+    "bundle_scaffold_failures_total",
+    "Scaffolds de submódulos que fallaron.",
+    ("template",),
+)
+CACHE_LOOKUPS = metrics.counter(
+    "bundle_cache_lookups_total",
+    "Lecturas de caches por resultado (hit ratio = hit / total).",
+    ("cache", "result"),
+)
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "bundle_http_requests_in_flight",
+    "Requests en curso (suma de los workers vivos).",
+)
+
+
+def init_metrics(app: Flask) -> Optional[MetricsRegistry]:
+    """
+    Gauge de requests en curso + collectors de los caches. /metrics vive en routes/metrics.py.
+    """
+    if not metrics.enabled:
+        return None
+
+    from services.profile_cache import profile_cache
+    from services.response_cache import upstream_cache
+
+    def _cache_stats() -> Iterable[Tuple[str, Dict[str, str], float]]:
+        p = profile_cache.stats()
+        for result, stat in (("hit", "hits"), ("stale", "stale_hits"), ("disk", "disk_hits"), ("miss", "misses")):
+            yield CACHE_LOOKUPS.name, {"cache": "profile", "result": result}, p[stat]
+        u = upstream_cache.stats()
+        for result, stat in (("hit", "hits"), ("revalidated", "revalidated"), ("stale", "stale_served"), ("miss", "misses")):
+            yield CACHE_LOOKUPS.name, {"cache": "upstream", "result": result}, u[stat]
+
+    metrics.collectors.append(_cache_stats)
+    install_request_metrics(app)
+    return metrics
+
+
+def install_request_metrics(app: Flask) -> None:
+    """
+    Gauge de requests en curso sobre `app` (el core o una app hija de submódulo).
+    """
+    @app.before_request
+    def _track_in_flight() -> None:
+        REQUESTS_IN_FLIGHT.inc()
+        g.metrics_in_flight = True
+
+    @app.teardown_request
+    def _untrack_in_flight(exc: Optional[BaseException]) -> None:
+        # otro before_request pudo cortar antes de que sumáramos
+        if g.pop("metrics_in_flight", False):
+            REQUESTS_IN_FLIGHT.dec()
@@ -0,0 +1,308 @@
+# services/module_loader.py
+from __future__ import annotations
+
+import importlib
+import json
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from flask import Flask, current_app
+from jinja2 import Environment
+
+EXTENSION_KEY = "module_loader"
+
+WSGIApp = Callable[[Dict[str, Any], Callable[..., Any]], Iterable[bytes]]
+ChildHook = Callable[["LoadedModule", Flask], None]
+
+
+@dataclass
+class LoadedModule:
+    """
+    Submódulo declarado por su module.manifest.json. La app hija se crea recién con
+    el 1er request a su url_prefix.
+    """
+    key: str                     # "<module>/<submodule>"
+    root: Path                   # modules/<module>/<submodule>
+    url_prefix: str
+    import_name: str             # paquete del entrypoint (modules.finance.qwe.interface.web.web_bp)
+    attr: str                    # nombre del blueprint en ese módulo (web_bp)
+    manifest: Dict[str, Any] = field(default_factory=dict)
+
+    app: Optional[Flask] = None
+    import_ms: Optional[float] = None
+    loaded_at: Optional[float] = None
+    error: Optional[str] = None
+    reloads: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def package(self) -> str:
+        # modules.<module>.<submodule>: todo lo importado del submódulo cuelga de acá
+        return ".".join(self.import_name.split(".")[:3])
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "url_prefix": self.url_prefix,
+            "entrypoint": f"{self.import_name}:{self.attr}",
+            "loaded": self.app is not None,
+            "import_ms": self.import_ms,
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+            "reloads": self.reloads,
+        }
+
+
+class ModuleLoader:
+    """
+    Registra los submódulos de modules/*/*/module.manifest.json sin importarlos.
+
+    - Al arrancar solo se leen los manifests (JSON chico): el import del paquete del
+      submódulo (blueprints, templates, dependencias) queda diferido.
+    - El 1er request a su url_prefix importa el entrypoint y arma una app Flask hija
+      con ese blueprint; comparte config, secret y session con la app principal.
+    - Las rutas del submódulo ya incluyen su url_prefix (ej. /qwe/...), así que el
+      environ se pasa tal cual a la app hija.
+    - Los requests de la app hija no pasan por los hooks del core: lo que deba verlos
+      (timing, métricas, assets) se instala en cada hija vía child_hooks.
+    - Un url_prefix que choca con rutas del core (/api, /auth, ...) se ignora con warning.
+    """
+
+    MANIFEST = "module.manifest.json"
+
+    def __init__(self, parent: Flask, modules_root: Path) -> None:
+        self.parent = parent
+        self.modules_root = modules_root
+        self.project_root = modules_root.parent
+        self.modules: Dict[str, LoadedModule] = {}
+        self.skipped: Dict[str, str] = {}
+        self._core: set = set()
+        # se llaman con cada app hija recién armada (ej. pipeline de assets)
+        self.child_hooks: List[ChildHook] = []
+
+    # -----------------------
+    # Discovery (solo manifests)
+    # -----------------------
+    def _core_prefixes(self) -> set:
+        prefixes = set()
+        for rule in self.parent.url_map.iter_rules():
+            first = rule.rule.strip("/").split("/", 1)[0]
+            if first and not first.startswith("<"):
+                prefixes.add(first)
+        return prefixes
+
+    def _parse_manifest(self, manifest_path: Path) -> LoadedModule:
+        data = json.loads(manifest_path.read_text(encoding="utf-8"))
+        root = manifest_path.parent
+        key = f"{root.parent.name}/{root.name}"
+
+        entry = str(data.get("entrypoint") or "")
+        path_part, _, attr = entry.partition(":")
+        if not path_part.endswith(".py") or not attr:
+            raise ValueError(f"entrypoint inválido: {entry!r} (se espera 'ruta/al/archivo.py:blueprint')")
+
+        entry_file = (self.project_root / path_part).resolve()
+        if root.resolve() not in entry_file.parents:
+            raise ValueError(f"entrypoint fuera del submódulo: {entry!r}")
+
+        import_name = ".".join(entry_file.relative_to(self.project_root.resolve()).with_suffix("").parts)
+        url_prefix = "/" + str(data.get("url_prefix") or root.name).strip("/")
+        return LoadedModule(
+            key=key,
+            root=root,
+            url_prefix=url_prefix,
+            import_name=import_name,
+            attr=attr,
+            manifest=data,
+        )
+
+    def _register(self, manifest_path: Path) -> Optional[LoadedModule]:
+        key = f"{manifest_path.parent.parent.name}/{manifest_path.parent.name}"
+        self.skipped.pop(key, None)
+        try:
+            mod = self._parse_manifest(manifest_path)
+        except (OSError, ValueError) as e:
+            self.skipped[key] = str(e)
+            self.parent.logger.warning("Submódulo %s ignorado: %s", key, e)
+            return None
+
+        first = mod.url_prefix.strip("/").split("/", 1)[0]
+        if first in self._core:
+            self.skipped[key] = f"url_prefix {mod.url_prefix} choca con rutas del bundle"
+        elif any(m.url_prefix == mod.url_prefix and m.key != key for m in self.modules.values()):
+            self.skipped[key] = f"url_prefix {mod.url_prefix} duplicado"
+        if key in self.skipped:
+            self.parent.logger.warning("Submódulo %s ignorado: %s", key, self.skipped[key])
+            return None
+
+        self.modules[key] = mod
+        return mod
+
+    def discover(self) -> None:
+        self._core = self._core_prefixes()
+        if not self.modules_root.is_dir():
+            return
+
+        for manifest_path in sorted(self.modules_root.glob(f"*/*/{self.MANIFEST}")):
+            if any(part.startswith(".") for part in manifest_path.relative_to(self.modules_root).parts[:-1]):
+                continue  # .trash, .scaffold-*
+            self._register(manifest_path)
+
+    # -----------------------
+    # Hot reload
+    # -----------------------
+    def _unload(self, mod: LoadedModule) -> None:
+        with mod.lock:
+            mod.app = None  # requests en vuelo terminan con la app vieja
+            for name in [n for n in sys.modules if n == mod.package or n.startswith(mod.package + ".")]:
+                sys.modules.pop(name, None)
+        importlib.invalidate_caches()
+
+    def reload(self, root: Path) -> Optional[LoadedModule]:
+        """
+        Re-lee el manifest de modules/<module>/<submodule> y descarta su app hija y sus
+        módulos importados: el próximo request lo vuelve a importar desde disco.
+        Si el manifest ya no existe, el submódulo se desmonta.
+        """
+        key = f"{root.parent.name}/{root.name}"
+        old = self.modules.pop(key, None)
+        if old is not None:
+            self._unload(old)
+
+        manifest_path = root / self.MANIFEST
+        mod = self._register(manifest_path) if manifest_path.exists() else None
+        if mod is not None and old is not None:
+            mod.reloads = old.reloads + 1
+        self.parent.logger.info("Submódulo %s %s", key, "recargado" if mod else "desmontado")
+        return mod
+
+    def clear_template_cache(self, key: str) -> None:
+        """
+        Solo cambiaron templates/static: basta con vaciar el cache de Jinja de la app hija.
+        """
+        mod = self.modules.get(key)
+        if mod is not None and mod.app is not None and mod.app.jinja_env.cache is not None:
+            mod.app.jinja_env.cache.clear()
+
+    # -----------------------
+    # Carga diferida
+    # -----------------------
+    def web_dir(self, mod: LoadedModule) -> Path:
+        """
+        Carpeta del entrypoint (interface/web): ahí viven templates/ y static/.
+        """
+        return self.project_root / Path(*mod.import_name.split(".")).parent
+
+    def _child_app(self, mod: LoadedModule) -> Flask:
+        """
+        App Flask hija sin blueprint (no importa nada del submódulo): la usa _build_child
+        y el warm-up de templates, así ambos compilan con el mismo jinja_env.
+        """
+        web_dir = self.web_dir(mod)
+        child = Flask(
+            mod.import_name,
+            root_path=str(web_dir),
+            template_folder="templates",
+            static_folder="static" if (web_dir / "static").is_dir() else None,
+            static_url_path=f"{mod.url_prefix}/static",
+        )
+        child.config.from_mapping(self.parent.config)
+        child.secret_key = self.parent.secret_key
+        child.session_interface = self.parent.session_interface
+        child.extensions = self.parent.extensions
+        # bytecode de Jinja compartido con el core (ver services/template_cache.py)
+        child.jinja_env.bytecode_cache = self.parent.jinja_env.bytecode_cache
+        return child
+
+    def _build_child(self, mod: LoadedModule) -> Flask:
+        if str(self.project_root) not in sys.path:
+            sys.path.insert(0, str(self.project_root))
+
+        t0 = time.perf_counter()
+        blueprint = getattr(importlib.import_module(mod.import_name), mod.attr)
+
+        child = self._child_app(mod)
+        child.register_blueprint(blueprint)
+        for hook in self.child_hooks:
+            hook(mod, child)
+
+        mod.import_ms = round((time.perf_counter() - t0) * 1000, 2)
+        mod.loaded_at = time.time()
+        self.parent.logger.info("Submódulo %s cargado en %.1f ms (%s)", mod.key, mod.import_ms, mod.url_prefix)
+        return child
+
+    def template_env(self, mod: LoadedModule) -> Environment:
+        """
+        jinja_env del submódulo: el de su app hija si ya está cargada; si no, uno
+        equivalente que no importa el paquete.
+        """
+        child = mod.app or self._child_app(mod)
+        return child.jinja_env
+
+    def get_app(self, mod: LoadedModule) -> Optional[Flask]:
+        if mod.app is not None:
+            return mod.app
+        with mod.lock:
+            if mod.app is None:
+                try:
+                    mod.app = self._build_child(mod)
+                    mod.error = None
+                except Exception as e:
+                    mod.error = f"{e.__class__.__name__}: {e}"
+                    self.parent.logger.exception("No se pudo cargar el submódulo %s", mod.key)
+                    return None
+        return mod.app
+
+    def match(self, path: str) -> Optional[LoadedModule]:
+        for mod in sorted(self.modules.values(), key=lambda m: len(m.url_prefix), reverse=True):
+            if path == mod.url_prefix or path.startswith(mod.url_prefix + "/"):
+                return mod
+        return None
+
+    def wsgi(self, fallback: WSGIApp) -> WSGIApp:
+        """
+        Middleware: rutas de submódulos → app hija (lazy); el resto → app principal.
+        """
+        def dispatch(environ: Dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+            mod = self.match(environ.get("PATH_INFO") or "")
+            if mod is None:
+                return fallback(environ, start_response)
+
+            child = self.get_app(mod)
+            if child is None:
+                # el detalle (mod.error) queda en el log: no se le muestra al cliente
+                body = f"No se pudo cargar el submódulo {mod.key}.".encode("utf-8")
+                start_response("500 INTERNAL SERVER ERROR", [
+                    ("Content-Type", "text/plain; charset=utf-8"),
+                    ("Content-Length", str(len(body))),
+                ])
+                return [body]
+            return child.wsgi_app(environ, start_response)
+
+        return dispatch
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "modules": [m.status() for m in self.modules.values()],
+            "skipped": dict(self.skipped),
+        }
+
+
+def init_module_loader(app: Flask) -> ModuleLoader:
+    """
+    Lee los manifests y monta el dispatcher. Llamar después de registrar los
+    blueprints del core (se usan para detectar prefijos en conflicto).
+    """
+    loader = ModuleLoader(app, Path(app.root_path) / "modules")
+    loader.discover()
+    app.wsgi_app = loader.wsgi(app.wsgi_app)  # type: ignore[method-assign]
+    app.extensions[EXTENSION_KEY] = loader
+    return loader
+
+
+def get_module_loader() -> ModuleLoader:
+    return current_app.extensions[EXTENSION_KEY]
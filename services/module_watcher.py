@@ -0,0 +1,125 @@
+# services/module_watcher.py
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from flask import Flask
+
+from config import Settings
+from services.module_loader import ModuleLoader
+from services.submodule_workspace import SubmoduleWorkspaceService
+
+EXTENSION_KEY = "module_hot_reload"
+
+# Carpetas pesadas o generadas que no afectan al código del submódulo
+IGNORED_DIRS = frozenset({"__pycache__", ".git", "node_modules", ".venv", "venv", ".pytest_cache"})
+
+# Cambios acá implican re-importar el paquete; el resto (templates/static) solo limpia caches
+CODE_SUFFIXES = frozenset({".py", ".json"})
+
+Snapshot = Dict[str, int]
+
+
+def _snapshot(root: Path) -> Snapshot:
+    files: Snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in IGNORED_DIRS]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                files[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+    return files
+
+
+class ModuleHotReloader:
+    """
+    Hot reload del workspace seleccionado sin reiniciar el bundle.
+
+    - Un thread hace polling de modules/<domain>/<subdomain> (solo el seleccionado).
+    - .py / manifest cambiados: se descarta la app hija y sus módulos importados; el
+      próximo request re-importa (ModuleLoader.reload).
+    - Solo templates/static: se vacía el cache de Jinja de la app hija.
+    - routes/, services/ y el resto del core siguen bajo el reloader de Werkzeug
+      (modules/ se excluye de él: ver reloader_exclude_patterns()).
+    """
+
+    def __init__(self, loader: ModuleLoader, workspace: SubmoduleWorkspaceService, interval: float) -> None:
+        self.loader = loader
+        self.workspace = workspace
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._watched: Optional[Tuple[Path, Snapshot]] = None
+
+    def _selected_root(self) -> Optional[Path]:
+        selected = self.workspace.get_selected()
+        if not selected:
+            return None
+        return self.workspace.modules_root / str(selected.get("domain")) / str(selected.get("subdomain"))
+
+    def check(self) -> None:
+        """
+        1 ciclo de polling (lo llama el thread; público para poder forzarlo).
+        """
+        root = self._selected_root()
+        old_root = self._watched[0] if self._watched is not None else None
+
+        if root != old_root:
+            # cambió el seleccionado (creado / borrado / otro): desmontar el viejo y
+            # montar el nuevo sin importar nada todavía
+            if old_root is not None:
+                self.loader.reload(old_root)
+            if root is not None and f"{root.parent.name}/{root.name}" not in self.loader.modules:
+                self.loader.reload(root)
+            self._watched = (root, _snapshot(root)) if root is not None else None
+            return
+        if root is None:
+            return
+
+        current = _snapshot(root)
+        previous = self._watched[1]
+        if current == previous:
+            return
+        self._watched = (root, current)
+
+        changed = {p for p in current.keys() | previous.keys() if current.get(p) != previous.get(p)}
+        if any(Path(p).suffix in CODE_SUFFIXES for p in changed):
+            self.loader.reload(root)
+        else:
+            self.loader.clear_template_cache(f"{root.parent.name}/{root.name}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                self.loader.parent.logger.exception("module hot reload falló")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="module-hot-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def init_module_hot_reload(app: Flask, loader: ModuleLoader, workspace: SubmoduleWorkspaceService) -> ModuleHotReloader:
+    reloader = ModuleHotReloader(loader, workspace, interval=Settings.MODULE_WATCH_INTERVAL_SECONDS)
+    reloader.start()
+    app.extensions[EXTENSION_KEY] = reloader
+    return reloader
+
+
+def reloader_exclude_patterns(app: Flask) -> list:
+    """
+    Patrones para el reloader de Werkzeug: modules/ lo maneja ModuleHotReloader.
+    """
+    return [str(Path(app.root_path) / "modules" / "*")]
@@ -0,0 +1,244 @@
+# services/profile_cache.py
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from config import Settings
+from services.disk_cache import DiskCache, disk_cache
+
+DISK_NAMESPACE = "profile"
+
+
+@dataclass
+class _ProfileEntry:
+    profile: Dict[str, Any]
+    stored_at: float
+
+
+class ProfileCache:
+    """
+    Cache en memoria de /dev/oauth/profile, indexado por hash del access_token.
+
+    - Fresco (edad < ttl): se sirve directo, sin red.
+    - Stale (ttl <= edad < ttl + stale): se sirve el valor viejo y se revalida
+      en background (stale-while-revalidate).
+    - Expirado: miss, el caller debe ir a Cubicornio y hacer put(). La entrada se
+      conserva (hasta que la saque el LRU) para servirla vía peek() si Cubicornio falla.
+    - Tamaño acotado con eviction LRU.
+
+    - Opcional: `disk` como segundo nivel persistente (sobrevive reinicios).
+
+    Nunca guardamos el token en claro, solo su sha256.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        stale_seconds: int,
+        max_entries: int,
+        disk: Optional[DiskCache] = None,
+    ) -> None:
+        self.ttl_seconds = max(0, ttl_seconds)
+        self.stale_seconds = max(0, stale_seconds)
+        self.max_entries = max(1, max_entries)
+        self.disk = disk
+
+        self._entries: "OrderedDict[str, _ProfileEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._revalidating: set[str] = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="profile-swr")
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    @staticmethod
+    def key_for(access_token: str) -> str:
+        return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+    def _evict_overflow(self) -> None:
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _mark_used(self, key: str) -> None:
+        # entre la lectura y este punto otro thread pudo desalojar/invalidar la key
+        if key in self._entries:
+            self._entries.move_to_end(key)
+
+    def _load_from_disk(self, key: str) -> Optional[_ProfileEntry]:
+        """
+        Lee una entrada del cache en disco (si hay y sigue usable).
+        Se llama SIN self._lock: es I/O de SQLite y no debe frenar a los demás threads.
+        """
+        if self.disk is None:
+            return None
+        found = self.disk.get(DISK_NAMESPACE, key)
+        if found is None or not isinstance(found.value, dict):
+            return None
+        return _ProfileEntry(profile=found.value, stored_at=found.stored_at)
+
+    def _promote(self, key: str, loaded: Optional[_ProfileEntry]) -> Optional[_ProfileEntry]:
+        """
+        Sube a memoria lo leído de disco, salvo que otro thread haya guardado algo
+        más nuevo mientras tanto. Debe llamarse con self._lock tomado.
+        """
+        current = self._entries.get(key)
+        if current is not None and (loaded is None or current.stored_at >= loaded.stored_at):
+            return current
+        if loaded is None:
+            return None
+        self._entries[key] = loaded
+        self._evict_overflow()
+        return loaded
+
+    def _store_on_disk(self, key: str, entry: _ProfileEntry) -> None:
+        if self.disk is not None:
+            self.disk.set(
+                DISK_NAMESPACE,
+                key,
+                entry.profile,
+                ttl_seconds=self.ttl_seconds + self.stale_seconds,
+                stored_at=entry.stored_at,
+            )
+
+    # -----------------------
+    # API
+    # -----------------------
+    def get(
+        self,
+        access_token: str,
+        revalidate: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve el perfil cacheado o None (miss).
+        Si el valor está stale y hay `revalidate`, se programa un refresh en background
+        con el mismo access_token (sin request context: no debe tocar la session).
+        """
+        key = self.key_for(access_token)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+        loaded = None
+        if entry is None:
+            loaded = self._load_from_disk(key)
+
+        with self._lock:
+            if entry is None:
+                entry = self._promote(key, loaded)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                if entry is loaded:
+                    self.disk_hits += 1
+
+            age = now - entry.stored_at
+            if age < self.ttl_seconds:
+                self._mark_used(key)
+                self.hits += 1
+                return entry.profile
+
+            if age >= self.ttl_seconds + self.stale_seconds:
+                self.misses += 1
+                return None
+
+            self._mark_used(key)
+            self.stale_hits += 1
+            schedule = revalidate is not None and key not in self._revalidating
+            if schedule:
+                self._revalidating.add(key)
+
+        if schedule:
+            self._executor.submit(self._revalidate, key, access_token, revalidate)
+        return entry.profile
+
+    def peek(self, access_token: str) -> Optional[Dict[str, Any]]:
+        """
+        Lee sin contar hit/miss ni tocar el orden LRU, ignorando el TTL.
+        Sirve para derivar scopes y como stale-if-error cuando Cubicornio no responde.
+        """
+        key = self.key_for(access_token)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            loaded = self._load_from_disk(key)
+            with self._lock:
+                entry = self._promote(key, loaded)
+        return entry.profile if entry else None
+
+    def put(self, access_token: str, profile: Dict[str, Any]) -> None:
+        key = self.key_for(access_token)
+        entry = _ProfileEntry(profile=profile, stored_at=time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict_overflow()
+        self._store_on_disk(key, entry)
+
+    def invalidate(self, access_token: Optional[str]) -> None:
+        if not access_token:
+            return
+        key = self.key_for(access_token)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.disk is not None:
+            self.disk.delete(DISK_NAMESPACE, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+            }
+
+    def _revalidate(
+        self,
+        key: str,
+        access_token: str,
+        revalidate: Callable[[str], Optional[Dict[str, Any]]],
+    ) -> None:
+        try:
+            profile = revalidate(access_token)
+            if profile is not None:
+                entry = _ProfileEntry(profile=profile, stored_at=time.time())
+                with self._lock:
+                    # si lo invalidaron mientras revalidábamos, no lo resucitamos
+                    alive = key in self._entries
+                    if alive:
+                        self._entries[key] = entry
+                        self._entries.move_to_end(key)
+                if alive:
+                    self._store_on_disk(key, entry)
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+
+
+profile_cache = ProfileCache(
+    ttl_seconds=Settings.PROFILE_CACHE_TTL_SECONDS,
+    stale_seconds=Settings.PROFILE_CACHE_STALE_SECONDS,
+    max_entries=Settings.PROFILE_CACHE_MAX_ENTRIES,
+    disk=disk_cache,
+)
@@ -0,0 +1,164 @@
+# services/repo_mirror.py
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from config import Settings
+from services.file_lock import file_lock
+from services.git_cli import GitError, run_git
+
+ProgressFn = Callable[[str, str], None]
+
+# marca de uso dentro de cada mirror (bare repos toleran archivos extra)
+LAST_USED_FILE = "bundle-last-used"
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class RepoMirrorCache:
+    """
+    Cache local de mirrors bare por repo_url (BUNDLE_CACHE_DIR/mirrors).
+
+    - 1er init de un repo: `git clone --mirror`. Siguientes: solo `git fetch` del delta.
+    - El working tree se clona desde el mirror local (hardlinks de objects, sin red)
+      y después `origin` se apunta al repo_url real.
+    - Tamaño acotado: al pasarse de max_bytes se borran los mirrors menos usados.
+    - Un flock por mirror evita 2 fetch/clone simultáneos del mismo repo entre workers.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    def _key(self, repo_url: str) -> str:
+        return hashlib.sha256(repo_url.strip().encode("utf-8")).hexdigest()[:24]
+
+    def _mirror_path(self, repo_url: str) -> Path:
+        return self.root / f"{self._key(repo_url)}.git"
+
+    def _touch(self, mirror: Path) -> None:
+        try:
+            (mirror / LAST_USED_FILE).write_text(str(time.time()), encoding="utf-8")
+        except OSError:
+            pass
+
+    def _last_used(self, mirror: Path) -> float:
+        try:
+            return (mirror / LAST_USED_FILE).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _mirrors(self) -> List[Path]:
+        try:
+            return [p for p in self.root.iterdir() if p.is_dir() and p.suffix == ".git"]
+        except OSError:
+            return []
+
+    # -----------------------
+    # API
+    # -----------------------
+    def _lock(self, mirror: Path) -> ContextManager[None]:
+        return file_lock(self.root / f"{mirror.stem}.lock")
+
+    def _update(self, repo_url: str, mirror: Path, report: ProgressFn) -> None:
+        # con el lock del mirror tomado
+        if mirror.exists():
+            report("mirror_fetch", "Actualizando mirror local (solo cambios nuevos)")
+            try:
+                run_git(["--git-dir", str(mirror), "remote", "set-url", "origin", repo_url])
+                run_git(["--git-dir", str(mirror), "fetch", "--quiet", "--prune", "origin"])
+            except GitError as e:
+                report("mirror_stale", f"No se pudo actualizar el mirror, se usa la copia local: {e.message[:200]}")
+        else:
+            report("mirror_clone", f"Creando mirror local de {repo_url}")
+            tmp = self.root / f".{mirror.stem}.{uuid.uuid4().hex}.tmp"
+            try:
+                run_git(["clone", "--quiet", "--mirror", "--", repo_url, str(tmp)])
+                os.rename(tmp, mirror)
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        self._touch(mirror)
+
+    def ensure(self, repo_url: str, progress: Optional[ProgressFn] = None) -> Path:
+        """
+        Devuelve el mirror local de repo_url actualizado (clone la 1ra vez, fetch después).
+        Si el fetch falla pero hay mirror, se usa el que hay (mejor que no crear nada).
+        """
+        report: ProgressFn = progress or (lambda step, message: None)
+        self.root.mkdir(parents=True, exist_ok=True)
+        mirror = self._mirror_path(repo_url)
+
+        with self._lock(mirror):
+            self._update(repo_url, mirror, report)
+
+        self.evict(keep=mirror)
+        return mirror
+
+    def clone(self, repo_url: str, dest: Path, progress: Optional[ProgressFn] = None) -> None:
+        """
+        Working tree en `dest` desde el mirror; origin queda apuntando a repo_url.
+        El lock del mirror se mantiene durante el clone local: evict() de otro worker
+        no puede borrarlo a mitad de camino.
+        """
+        report: ProgressFn = progress or (lambda step, message: None)
+        self.root.mkdir(parents=True, exist_ok=True)
+        mirror = self._mirror_path(repo_url)
+
+        with self._lock(mirror):
+            self._update(repo_url, mirror, report)
+            run_git(["clone", "--quiet", "--local", "--", str(mirror), str(dest)])
+
+        run_git(["remote", "set-url", "origin", repo_url], cwd=dest)
+        self.evict(keep=mirror)
+
+    def evict(self, keep: Optional[Path] = None) -> int:
+        """
+        LRU por tamaño: borra mirrors (el menos usado primero) hasta quedar bajo max_bytes.
+        """
+        sized: List[Tuple[float, int, Path]] = [(self._last_used(p), _dir_size(p), p) for p in self._mirrors()]
+        total = sum(size for _, size, _ in sized)
+        removed = 0
+        for _, size, path in sorted(sized, key=lambda x: x[0]):
+            if total <= self.max_bytes:
+                break
+            if keep is not None and path == keep:
+                continue
+            with self._lock(path):
+                shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        mirrors = self._mirrors()
+        return {
+            "path": str(self.root),
+            "max_bytes": self.max_bytes,
+            "bytes": sum(_dir_size(p) for p in mirrors),
+            "mirrors": len(mirrors),
+        }
+
+
+repo_mirrors: Optional[RepoMirrorCache] = (
+    RepoMirrorCache(root=Path(Settings.REPO_MIRROR_DIR), max_bytes=Settings.REPO_MIRROR_MAX_BYTES)
+    if Settings.REPO_MIRROR_ENABLED
+    else None
+)
@@ -0,0 +1,169 @@
+# services/request_timing.py
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from flask import Flask, Response, before_render_template, g, has_request_context, request, template_rendered
+
+from config import Settings
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Todo vive en el environ del request: lo comparten los threads del fan-out
+# (copy_current_request_context copia el contexto, no el environ)
+ENVIRON_TIMINGS = "bundle.timings"
+ENVIRON_RENDER_STACK = "bundle.render_stack"
+ENVIRON_STARTED = "bundle.started"
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{8,64}$")
+
+timing_logger = logging.getLogger("bundle.timing")
+
+Timings = List[Tuple[str, float]]
+
+
+def _record(name: str, ms: float, background: bool = False) -> None:
+    if has_request_context():
+        request.environ.setdefault(ENVIRON_TIMINGS, []).append((name, ms))
+    elif background:
+        # jobs en background (init de workspace, scaffold): sin request, solo log
+        timing_logger.info(json.dumps({"event": "timing", "phase": name, "ms": round(ms, 2)}))
+    # resto fuera de request (watcher de hot reload, revalidaciones): se descarta
+
+
+def timed(name: str, background: bool = False) -> Callable[[F], F]:
+    """
+    Mide la función como fase `name` del request (Server-Timing + log).
+
+    Fuera de un request solo se loguea con `background=True` (fases de jobs que vale la
+    pena medir); el resto se descarta para no llenar el log con lecturas periódicas.
+    Con REQUEST_TIMING apagado devuelve la función tal cual: sin wrapper, costo cero.
+    """
+    def decorator(fn: F) -> F:
+        if not Settings.REQUEST_TIMING:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _record(name, (time.perf_counter() - t0) * 1000, background)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _summary(timings: Timings) -> Dict[str, Dict[str, Any]]:
+    phases: Dict[str, Dict[str, Any]] = {}
+    for name, ms in timings:
+        entry = phases.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += ms
+        entry["count"] += 1
+    for entry in phases.values():
+        entry["ms"] = round(entry["ms"], 2)
+    return phases
+
+
+def server_timing_header(timings: Timings, total_ms: Optional[float] = None) -> str:
+    parts = []
+    for name, entry in _summary(timings).items():
+        part = f"{name};dur={entry['ms']}"
+        if entry["count"] > 1:
+            part += f';desc="x{entry["count"]}"'
+        parts.append(part)
+    if total_ms is not None:
+        parts.append(f"total;dur={round(total_ms, 2)}")
+    return ", ".join(parts)
+
+
+def _on_before_render(app: Flask, template: Any, context: Dict[str, Any], **extra: Any) -> None:
+    if has_request_context():
+        request.environ.setdefault(ENVIRON_RENDER_STACK, []).append(time.perf_counter())
+
+
+def _on_rendered(app: Flask, template: Any, context: Dict[str, Any], **extra: Any) -> None:
+    if not has_request_context():
+        return
+    stack = request.environ.get(ENVIRON_RENDER_STACK)
+    if stack:
+        _record("render", (time.perf_counter() - stack.pop()) * 1000)
+
+
+def install_request_timing(app: Flask) -> None:
+    """
+    Hooks de request id, Server-Timing, log y render de Jinja sobre `app` (el core o
+    una app hija de submódulo, ver ModuleLoader.child_hooks).
+
+    - Server-Timing: las fases que terminaron antes de mandar los headers. En páginas con
+      streaming el render termina después: queda solo en el log.
+    - Log: 1 línea JSON por request en el logger "bundle.timing", al cerrar la respuesta.
+    """
+    before_render_template.connect(_on_before_render, app, weak=False)
+    template_rendered.connect(_on_rendered, app, weak=False)
+
+    @app.before_request
+    def _start_timing() -> None:
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        request.environ[ENVIRON_STARTED] = time.perf_counter()
+        request.environ.setdefault(ENVIRON_TIMINGS, [])
+
+    @app.after_request
+    def _emit_timing(response: Response) -> Response:
+        environ = request.environ
+        started = environ.get(ENVIRON_STARTED)
+        if started is None:
+            return response
+        request_id = g.get("request_id")
+
+        timings: Timings = environ.get(ENVIRON_TIMINGS, [])
+        response.headers["Server-Timing"] = server_timing_header(
+            list(timings), (time.perf_counter() - started) * 1000,
+        )
+        response.headers[REQUEST_ID_HEADER] = request_id
+
+        method, path, status = request.method, request.path, response.status_code
+
+        def _log() -> None:
+            timing_logger.info(json.dumps({
+                "event": "request",
+                "request_id": request_id,
+                "method": method,
+                "path": path,
+                "status": status,
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                "phases": _summary(timings),
+            }, ensure_ascii=False))
+
+        # al cerrar: incluye lo que se renderizó en streaming después de los headers
+        response.call_on_close(_log)
+        return response
+
+
+def init_request_timing(app: Flask) -> bool:
+    """
+    Configura el logger e instala los hooks en la app principal.
+    No hace nada si REQUEST_TIMING está apagado.
+    """
+    if not Settings.REQUEST_TIMING:
+        return False
+
+    if not timing_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+        timing_logger.addHandler(handler)
+        timing_logger.setLevel(logging.INFO)
+        timing_logger.propagate = False
+
+    install_request_timing(app)
+    return True
@@ -0,0 +1,211 @@
+# services/response_cache.py
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from config import Settings
+from services.circuit_breaker import CircuitOpenError
+from services.cubicornio_oauth import CubicornioAuthError, authorized_get, get_valid_access_token
+from services.disk_cache import DiskCache, disk_cache
+from services.profile_cache import profile_cache
+
+DISK_NAMESPACE = "upstream"
+
+
+@dataclass
+class CachedResponse:
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+
+@dataclass
+class UpstreamResult:
+    """
+    Resultado de un GET cacheado: `data` es el JSON ya parseado cuando ok=True;
+    si no, `status_code`/`text` traen la respuesta de error de Cubicornio.
+    """
+    status_code: int
+    data: Any = None
+    text: str = ""
+    from_cache: bool = False
+    stale: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+class UpstreamResponseCache:
+    """
+    Cache de respuestas JSON de Cubicornio por (scope, path).
+
+    - Dentro de `fresh_seconds` se responde sin ir a la red.
+    - Después se revalida con If-None-Match / If-Modified-Since; un 304 reusa el body.
+    - Si Cubicornio falla (circuito abierto, red o 5xx) y hay una copia, se sirve
+      stale en vez de error.
+    - El scope es el par usuario/negocio del perfil cacheado (estable aunque rote el
+      token); si todavía no hay perfil, el hash del access_token.
+    - Opcional: `disk` como segundo nivel persistente; tras un reinicio se revalida
+      con el ETag guardado en vez de bajar todo de nuevo.
+    """
+
+    def __init__(self, fresh_seconds: float, max_entries: int, disk: Optional[DiskCache] = None) -> None:
+        self.fresh_seconds = fresh_seconds
+        self.max_entries = max(1, max_entries)
+        self.disk = disk
+
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.stale_served = 0
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    @staticmethod
+    def scope_for(access_token: str) -> str:
+        profile = profile_cache.peek(access_token) or {}
+        user = profile.get("user") or {}
+        business = profile.get("business") or {}
+        user_id = user.get("id") if isinstance(user, dict) else None
+        business_id = (business.get("id") or business.get("idbusiness")) if isinstance(business, dict) else None
+        if user_id and business_id:
+            return f"user:{user_id}|business:{business_id}"
+        return "token:" + hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _disk_key(key: Tuple[str, str]) -> str:
+        return f"{key[0]}|{key[1]}"
+
+    def _get(self, key: Tuple[str, str]) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if self.disk is None:
+            return None
+        found = self.disk.get(DISK_NAMESPACE, self._disk_key(key))
+        if found is None or not isinstance(found.value, dict):
+            return None
+        entry = CachedResponse(
+            data=found.value.get("data"),
+            etag=found.value.get("etag"),
+            last_modified=found.value.get("last_modified"),
+            stored_at=found.stored_at,
+        )
+        self._put(key, entry, persist=False)
+        return entry
+
+    def _put(self, key: Tuple[str, str], entry: CachedResponse, persist: bool = True) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        if persist and self.disk is not None:
+            self.disk.set(
+                DISK_NAMESPACE,
+                self._disk_key(key),
+                {"data": entry.data, "etag": entry.etag, "last_modified": entry.last_modified},
+                ttl_seconds=self.fresh_seconds,
+                stored_at=entry.stored_at,
+            )
+
+    # -----------------------
+    # API
+    # -----------------------
+    def get_json(self, path: str, access: Optional[str] = None) -> UpstreamResult:
+        """
+        GET autenticado (con refresh 401) pasando por el cache.
+        Lanza CubicornioAuthError igual que authorized_get; con `access` explícito no
+        toca la session (ver authorized_get).
+        """
+        import requests
+
+        explicit = access is not None
+        if not explicit:
+            access, _ = get_valid_access_token()
+            if not access:
+                raise CubicornioAuthError("oauth_not_connected")
+
+        key = (self.scope_for(access), path)
+        entry = self._get(key)
+        if entry is not None and time.time() - entry.stored_at < self.fresh_seconds:
+            self.hits += 1
+            return UpstreamResult(200, entry.data, from_cache=True)
+
+        headers: Dict[str, str] = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            resp, access = authorized_get(path, headers=headers or None, access=access if explicit else None)
+        except (CircuitOpenError, requests.RequestException):
+            if entry is None:
+                raise
+            self.stale_served += 1
+            return UpstreamResult(200, entry.data, from_cache=True, stale=True)
+
+        if resp.status_code >= 500 and entry is not None:
+            self.stale_served += 1
+            return UpstreamResult(200, entry.data, from_cache=True, stale=True)
+
+        if resp.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            entry.stored_at = time.time()
+            self._put(key, entry)
+            return UpstreamResult(200, entry.data, from_cache=True)
+
+        if not resp.ok:
+            return UpstreamResult(resp.status_code, text=resp.text)
+
+        self.misses += 1
+        data = resp.json()
+        self._put(
+            (self.scope_for(access), path),
+            CachedResponse(
+                data=data,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                stored_at=time.time(),
+            ),
+        )
+        return UpstreamResult(resp.status_code, data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "stale_served": self.stale_served,
+            }
+
+
+upstream_cache = UpstreamResponseCache(
+    fresh_seconds=Settings.UPSTREAM_CACHE_FRESH_SECONDS,
+    max_entries=Settings.UPSTREAM_CACHE_MAX_ENTRIES,
+    disk=disk_cache,
+)
@@ -0,0 +1,157 @@
+# services/scaffold_templates.py
+from __future__ import annotations
+
+from string import Template
+from typing import Dict, List, Tuple
+
+# Templates declarativos de submódulos (bundle_template → árbol de archivos).
+# Paths y contenidos usan placeholders ${module} / ${submodule}
+# (string.Template: no choca con {{ }} / {% %} de Jinja).
+
+DEFAULT_TEMPLATE = "python_flask_clean_v1"
+
+_PACKAGES = [
+    "",
+    "application",
+    "application/dto",
+    "application/services",
+    "application/transactions",
+    "application/use_cases",
+    "domain",
+    "domain/contracts",
+    "domain/entities",
+    "domain/value_objects",
+    "infrastructure",
+    "infrastructure/boundaries",
+    "infrastructure/models",
+    "infrastructure/repositories",
+    "interface",
+    "interface/web",
+    "interface/web/blueprints/base",
+    "interface/web/blueprints/registry",
+    "tests",
+]
+
+_KEEP_DIRS = [
+    "interface/web/static/${submodule}/css",
+    "interface/web/static/${submodule}/img",
+    "interface/web/static/${submodule}/js",
+]
+
+PYTHON_FLASK_CLEAN_V1: Dict[str, str] = {
+    **{(f"{pkg}/__init__.py" if pkg else "__init__.py"): "" for pkg in _PACKAGES},
+    **{f"{d}/.keep": "" for d in _KEEP_DIRS},
+    "module.manifest.json": """{
+  "module": "${module}",
+  "submodule": "${submodule}",
+  "version": "0.0.1",
+  "language": "python-flask",
+  "entrypoint": "modules/${module}/${submodule}/interface/web/web_bp.py:web_bp",
+  "description": "Describe aquí el propósito del submódulo.",
+  "scopes_required": ["bundle:read"],
+  "ui": {
+    "menu_title": "${submodule}",
+    "icon": "puzzle"
+  }
+}
+""",
+    "docs/index.md": """# ${module} / ${submodule}
+
+## Propósito
+Describe qué hace este submódulo.
+
+## Integración
+- Scopes requeridos: bundle:read (por ahora)
+""",
+    "interface/web/web_bp.py": """from __future__ import annotations
+from flask import Blueprint
+
+from .blueprints.base.base_bp import base_bp
+from .blueprints.registry.registry_bp import registry_bp
+
+web_bp = Blueprint("${module}_${submodule}", __name__)
+web_bp.register_blueprint(base_bp)
+web_bp.register_blueprint(registry_bp)
+""",
+    "interface/web/blueprints/base/base_bp.py": """from __future__ import annotations
+from flask import Blueprint, render_template
+
+base_bp = Blueprint("${module}_${submodule}_base", __name__, url_prefix="/${submodule}")
+
+@base_bp.get("/")
+def index():
+    return render_template("${submodule}/index.html")
+""",
+    "interface/web/blueprints/registry/registry_bp.py": """from __future__ import annotations
+from flask import Blueprint, render_template
+
+registry_bp = Blueprint("${module}_${submodule}_registry", __name__, url_prefix="/${submodule}/registry")
+
+@registry_bp.get("/")
+def list_view():
+    return render_template("${submodule}/registry/list.html")
+
+@registry_bp.get("/new")
+def new_view():
+    return render_template("${submodule}/registry/form.html")
+""",
+    "interface/web/templates/${submodule}/_layout.html": """<!doctype html>
+<html lang="es">
+  <head>
+    <meta charset="utf-8">
+    <title>{{ title or "Submódulo" }}</title>
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <script src="https://cdn.tailwindcss.com"></script>
+  </head>
+  <body class="bg-slate-950 text-zinc-50 min-h-screen">
+    <div class="max-w-5xl mx-auto px-4 py-8">
+      {% block content %}{% endblock %}
+    </div>
+  </body>
+</html>
+""",
+    "interface/web/templates/${submodule}/index.html": """{% extends "${submodule}/_layout.html" %}
+{% block content %}
+  <div class="rounded-2xl border border-slate-800 bg-slate-900/30 p-6">
+    <h1 class="text-2xl font-bold">${module} / ${submodule}</h1>
+    <p class="text-sm text-zinc-300 mt-2">
+      Submódulo generado. Empieza creando tus vistas y endpoints.
+    </p>
+    <div class="mt-4 text-xs text-zinc-400 font-mono">Ruta: /${submodule}/</div>
+  </div>
+{% endblock %}
+""",
+    "interface/web/templates/${submodule}/registry/form.html": """{% extends "${submodule}/_layout.html" %}
+{% block content %}
+  <div class="rounded-2xl border border-slate-800 bg-slate-900/30 p-6">
+    <h2 class="text-xl font-bold">Registry · Form</h2>
+    <p class="text-sm text-zinc-300 mt-2">Placeholder para formulario.</p>
+  </div>
+{% endblock %}
+""",
+    "interface/web/templates/${submodule}/registry/list.html": """{% extends "${submodule}/_layout.html" %}
+{% block content %}
+  <div class="rounded-2xl border border-slate-800 bg-slate-900/30 p-6">
+    <h2 class="text-xl font-bold">Registry · List</h2>
+    <p class="text-sm text-zinc-300 mt-2">Placeholder para listado.</p>
+  </div>
+{% endblock %}
+""",
+}
+
+# Precompilados 1 vez al importar: render = solo substitute()
+_COMPILED: Dict[str, List[Tuple[Template, Template]]] = {
+    "python_flask_clean_v1": [(Template(p), Template(c)) for p, c in PYTHON_FLASK_CLEAN_V1.items()],
+}
+
+
+def available_templates() -> List[str]:
+    return sorted(_COMPILED)
+
+
+def render_template_tree(name: str, module: str, submodule: str) -> Dict[str, str]:
+    """
+    Devuelve {path relativo: contenido} del template `name`. KeyError si no existe.
+    """
+    ctx = {"module": module, "submodule": submodule}
+    return {p.substitute(ctx): c.substitute(ctx) for p, c in _COMPILED[name]}
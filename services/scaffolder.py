@@ -0,0 +1,125 @@
+# services/scaffolder.py
+from __future__ import annotations
+
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from services.git_cli import GitError, run_git
+from services.repo_mirror import repo_mirrors
+from services.request_timing import timed
+from services.scaffold_templates import available_templates, render_template_tree
+
+ProgressFn = Callable[[str, str], None]
+
+
+@dataclass
+class ScaffoldError(Exception):
+    message: str
+    status_code: int = 500
+
+
+class Scaffolder:
+    """
+    Genera el árbol de un submódulo en proceso (reemplaza scaffold_submodule.sh).
+
+    ✅ Transaccional:
+    - Todo se arma en modules/.scaffold-<uuid> (mismo filesystem que el destino).
+    - Al final, 1 rename atómico a modules/<module>/<submodule>: o existe el workspace
+      completo o no existe nada (un reinicio a mitad deja solo el tmp, que se limpia).
+    - Con repo_url, primero se clona el repo (vía mirror local si está habilitado)
+      y el template solo completa lo que falte (nunca pisa archivos del repo).
+    """
+
+    TMP_PREFIX = ".scaffold-"
+    # un tmp más viejo que esto no pertenece a ningún scaffold en curso
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, modules_root: Path) -> None:
+        self.modules_root = modules_root
+
+    @staticmethod
+    def supports(template: str) -> bool:
+        return template in available_templates()
+
+    def _clone(self, repo_url: str, branch: str, dest: Path, report: ProgressFn) -> None:
+        try:
+            if repo_mirrors is not None:
+                repo_mirrors.clone(repo_url, dest, progress=report)
+            else:
+                run_git(["clone", "--quiet", "--", repo_url, str(dest)])
+
+            # ramas inexistentes (repo vacío o rama nueva) se crean localmente
+            try:
+                run_git(["checkout", "--quiet", branch], cwd=dest)
+            except GitError:
+                run_git(["checkout", "--quiet", "-b", branch], cwd=dest)
+        except GitError as e:
+            raise ScaffoldError(e.message)
+
+    def cleanup_stale_tmp(self) -> None:
+        """
+        Borra restos de scaffolds interrumpidos (reinicio del server a mitad).
+        """
+        now = time.time()
+        try:
+            leftovers = [p for p in self.modules_root.iterdir() if p.name.startswith(self.TMP_PREFIX)]
+        except OSError:
+            return
+        for p in leftovers:
+            try:
+                if now - p.stat().st_mtime > self.STALE_TMP_SECONDS:
+                    shutil.rmtree(p, ignore_errors=True)
+            except OSError:
+                pass
+
+    @timed("scaffold", background=True)
+    def scaffold(
+        self,
+        template: str,
+        module: str,
+        submodule: str,
+        target: Path,
+        repo_url: Optional[str] = None,
+        branch: str = "main",
+        progress: Optional[ProgressFn] = None,
+    ) -> Path:
+        report: ProgressFn = progress or (lambda step, message: None)
+
+        if target.exists():
+            raise ScaffoldError(f"Ya existe modules/{module}/{submodule}.", 409)
+
+        files = render_template_tree(template, module, submodule)
+
+        self.modules_root.mkdir(parents=True, exist_ok=True)
+        self.cleanup_stale_tmp()
+        tmp = self.modules_root / f"{self.TMP_PREFIX}{uuid.uuid4().hex}"
+        try:
+            if repo_url:
+                report("clone", f"Clonando {repo_url} ({branch})")
+                self._clone(repo_url, branch, tmp, report)
+            else:
+                tmp.mkdir()
+
+            report("render", f"Generando {len(files)} archivos desde {template}")
+            for rel, content in files.items():
+                path = tmp / rel
+                if path.exists():
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(content, encoding="utf-8")
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(tmp, target)
+        except ScaffoldError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        except OSError as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise ScaffoldError(f"No se pudo escribir el workspace: {e.strerror or e}")
+
+        return target
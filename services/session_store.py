@@ -0,0 +1,256 @@
+# services/session_store.py
+from __future__ import annotations
+
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, Request, Response, current_app, session
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from config import Settings
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """
+    Session cuyo contenido vive en el backend; la cookie solo lleva el id firmado.
+    """
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None, sid: str = "", new: bool = False) -> None:
+        def on_update(self: "ServerSideSession") -> None:
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+# -----------------------
+# Backends
+# -----------------------
+class MemorySessionBackend:
+    """
+    Backend en memoria con TTL y LRU acotado.
+    Solo sirve con 1 worker: cada proceso tiene su propio dict.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            expires_at, raw = item
+            if expires_at <= time.time():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return raw
+
+    def save(self, sid: str, raw: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._data[sid] = (time.time() + ttl_seconds, raw)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class SQLiteSessionBackend:
+    """
+    Backend SQLite compartido entre workers (WAL + una conexión por thread).
+    Las sesiones expiradas se purgan como mucho cada PURGE_INTERVAL_SECONDS.
+    """
+
+    PURGE_INTERVAL_SECONDS = 300
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " sid TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[0]
+
+    def save(self, sid: str, raw: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+                (sid, raw, now + ttl_seconds),
+            )
+            if now - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+                self._last_purge = now
+                conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, sid: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+# -----------------------
+# Flask SessionInterface
+# -----------------------
+class ServerSideSessionInterface(SessionInterface):
+    """
+    La cookie lleva solo un id opaco firmado con SECRET_KEY.
+    El contenido (token OAuth, states, etc.) queda en el backend y solo se
+    reescribe cuando la session cambió.
+    """
+
+    serializer = session_json_serializer
+    salt = "bundle-server-session"
+
+    def __init__(self, backend: Any) -> None:
+        self.backend = backend
+
+    def _signer(self, app: Flask) -> Optional[Signer]:
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _ttl_seconds(self, app: Flask) -> int:
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app: Flask, request: Request) -> Optional[ServerSideSession]:
+        signer = self._signer(app)
+        if signer is None:
+            return None
+
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = signer.unsign(cookie).decode("utf-8")
+            except BadSignature:
+                sid = None
+
+            if sid:
+                raw = self.backend.load(sid)
+                if raw is not None:
+                    try:
+                        return ServerSideSession(self.serializer.loads(raw), sid=sid)
+                    except Exception:
+                        pass
+
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app: Flask, session: ServerSideSession, response: Response) -> None:  # type: ignore[override]
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.modified:
+                self.backend.delete(session.sid)
+                response.delete_cookie(
+                    name,
+                    domain=domain,
+                    path=path,
+                    secure=secure,
+                    samesite=samesite,
+                    httponly=httponly,
+                )
+                response.vary.add("Cookie")
+            return
+
+        if session.modified:
+            self.backend.save(session.sid, self.serializer.dumps(dict(session)), self._ttl_seconds(app))
+
+        if not (session.new or self.should_set_cookie(app, session)):
+            return
+
+        signer = self._signer(app)
+        assert signer is not None
+        response.set_cookie(
+            name,
+            signer.sign(session.sid).decode("utf-8"),
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+        response.vary.add("Cookie")
+
+
+def regenerate_session() -> None:
+    """
+    Emite un sid nuevo para la session del request (llamar al loguearse): la fila vieja
+    se borra del backend y el contenido se guarda bajo el sid nuevo, cuya cookie sale
+    con esta respuesta. Evita session fixation con un sid previo al login.
+    Con SESSION_BACKEND=cookie no hace nada (no hay sid).
+    """
+    interface = current_app.session_interface
+    current = session._get_current_object()
+    if not isinstance(interface, ServerSideSessionInterface) or not isinstance(current, ServerSideSession):
+        return
+
+    interface.backend.delete(current.sid)
+    current.sid = secrets.token_urlsafe(32)
+    current.new = True
+    current.modified = True
+
+
+def init_session_store(app: Flask) -> None:
+    """
+    Instala el backend de session según SESSION_BACKEND:
+    - "cookie": session firmada de Flask (comportamiento original)
+    - "memory": en memoria con LRU (1 worker)
+    - "sqlite": archivo SQLite compartido entre workers (default)
+    """
+    backend_name = (app.config.get("SESSION_BACKEND") or "sqlite").lower()
+
+    if backend_name == "cookie":
+        return
+    if backend_name == "memory":
+        backend: Any = MemorySessionBackend(max_entries=Settings.SESSION_STORE_MAX_ENTRIES)
+    elif backend_name == "sqlite":
+        backend = SQLiteSessionBackend(Path(Settings.SESSION_SQLITE_PATH))
+    else:
+        raise ValueError(f"SESSION_BACKEND desconocido: {backend_name}")
+
+    app.session_interface = ServerSideSessionInterface(backend)
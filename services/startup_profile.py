@@ -0,0 +1,143 @@
+# services/startup_profile.py
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Dependencias pesadas que un arranque "frío" no debería importar
+HEAVY_MODULES = ("authlib", "requests")
+
+# Lo que corre el proceso hijo (bajo -X importtime): import + create_app y un resumen en JSON
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from app_factory import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": round((t1 - t0) * 1000, 2),
+    "create_app_ms": round((t2 - t1) * 1000, 2),
+    "phases": app.extensions.get("startup_phases", []),
+    "heavy_loaded": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+
+# (argparse / subprocess / json se importan dentro de run_profile y main: create_app
+# solo usa StartupPhases y no debería pagar esos imports)
+
+
+class StartupPhases:
+    """
+    Tiempos por fase de create_app (quedan en app.extensions["startup_phases"]).
+    Costo: 2 perf_counter() por fase.
+    """
+
+    def __init__(self) -> None:
+        self.phases: List[Dict[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append({"name": name, "ms": round((time.perf_counter() - t0) * 1000, 2)})
+
+
+@dataclass
+class ImportNode:
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+
+def parse_importtime(stderr: str) -> List[ImportNode]:
+    """
+    Arma el árbol a partir de la salida de `python -X importtime` (post-order:
+    los hijos aparecen antes que el padre, con 2 espacios de sangría por nivel).
+    """
+    pending: List[tuple] = []  # (depth, node)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|", 2)
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, raw_name = parts
+        name = raw_name[1:]  # 1 espacio fijo después de "|"
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        try:
+            node = ImportNode(name=name.strip(), self_us=int(self_us), cumulative_us=int(cumulative_us))
+        except ValueError:
+            continue
+
+        while pending and pending[-1][0] > depth:
+            node.children.insert(0, pending.pop()[1])
+        pending.append((depth, node))
+    return [node for _, node in pending]
+
+
+def _print_tree(nodes: List[ImportNode], min_ms: float, out: TextIO, indent: int = 0) -> None:
+    for node in sorted(nodes, key=lambda n: n.cumulative_us, reverse=True):
+        if node.cumulative_us / 1000 < min_ms:
+            continue
+        out.write(f"{node.cumulative_us / 1000:9.1f} ms {node.self_us / 1000:8.1f} ms  {'  ' * indent}{node.name}\n")
+        _print_tree(node.children, min_ms, out, indent + 1)
+
+
+def run_profile(min_ms: float = 1.0, out: Optional[TextIO] = None) -> int:
+    """
+    Arranca la app en un proceso limpio con -X importtime e imprime:
+    árbol de imports (cumulative / self), fases de create_app y deps pesadas cargadas.
+    """
+    import json
+    import subprocess
+
+    out = out or sys.stdout
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=str(PROJECT_ROOT),
+        capture_output=True,
+        text=True,
+    )
+    summary_line = (proc.stdout.strip().splitlines() or [""])[-1]
+    if proc.returncode != 0 or not summary_line.startswith("{"):
+        out.write(proc.stderr[-2000:])
+        return proc.returncode or 1
+    summary = json.loads(summary_line)
+
+    roots = parse_importtime(proc.stderr)
+    app_roots = [n for n in roots if n.name in ("app_factory", "config")] or roots
+
+    out.write(f"\n== Imports (>= {min_ms:g} ms)      cumulative       self\n")
+    _print_tree(app_roots, min_ms, out)
+
+    out.write("\n== create_app\n")
+    for phase in summary["phases"]:
+        out.write(f"{phase['ms']:9.1f} ms  {phase['name']}\n")
+
+    out.write("\n== Total\n")
+    out.write(f"{summary['import_ms']:9.1f} ms  import app_factory\n")
+    out.write(f"{summary['create_app_ms']:9.1f} ms  create_app()\n")
+    heavy = summary["heavy_loaded"]
+    out.write(f"\nDependencias pesadas cargadas al arrancar: {', '.join(heavy) if heavy else 'ninguna'}\n")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Perfil de arranque del bundle")
+    parser.add_argument("--profile-startup", action="store_true")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ocultar imports más rápidos que esto")
+    args = parser.parse_args(argv)
+    return run_profile(min_ms=args.min_ms)
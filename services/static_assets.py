@@ -0,0 +1,256 @@
+# services/static_assets.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask, Response, request, send_file
+
+from config import Settings
+from services.module_loader import LoadedModule, ModuleLoader
+
+try:  # opcional: sin brotli solo se generan variantes .gz
+    import brotli  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None  # type: ignore[assignment]
+
+EXTENSION_KEY = "static_assets"
+
+# Solo vale la pena comprimir texto; imágenes/fuentes ya vienen comprimidas
+COMPRESSIBLE_SUFFIXES = frozenset({".js", ".mjs", ".css", ".svg", ".json", ".map", ".html", ".txt", ".xml"})
+MIN_COMPRESS_BYTES = 512
+
+HASH_CHARS = 12
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Versiones viejas de assets (deploys anteriores) se borran pasado este tiempo
+STALE_ASSET_SECONDS = 7 * 24 * 3600
+
+# (Content-Encoding, sufijo del archivo precomprimido), en orden de preferencia
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass
+class Asset:
+    logical: str                 # js/submodules.js
+    hashed: str                  # js/submodules.3f9a0c1e2b4d.js
+    path: Path                   # archivo fingerprinted (identity)
+    mimetype: str
+    variants: Dict[str, Path] = field(default_factory=dict)  # "br"/"gzip" → archivo
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _hashed_name(logical: str, digest: str) -> str:
+    p = Path(logical)
+    return str(p.with_name(f"{p.stem}.{digest}{p.suffix}")).replace(os.sep, "/")
+
+
+class StaticAssetScope:
+    """
+    Assets de 1 carpeta static (core o un submódulo), copiados con hash de contenido en
+    el nombre a <STATIC_ASSETS_DIR>/<scope>/ junto a sus variantes .gz / .br.
+
+    - build() es idempotente: un archivo con el mismo contenido ya existe con el mismo
+      nombre y no se reescribe (reinicios y workers en paralelo no repiten trabajo).
+    - Escrituras tmp + rename: nunca se sirve un archivo a medio escribir.
+    """
+
+    def __init__(self, name: str, source_dir: Path, out_dir: Path) -> None:
+        self.name = name
+        self.source_dir = source_dir
+        self.out_dir = out_dir
+        self.by_logical: Dict[str, Asset] = {}
+        self.by_hashed: Dict[str, Asset] = {}
+        self.build_ms: Optional[float] = None
+
+    def _build_one(self, src: Path) -> Asset:
+        data = src.read_bytes()
+        logical = src.relative_to(self.source_dir).as_posix()
+        hashed = _hashed_name(logical, hashlib.sha256(data).hexdigest()[:HASH_CHARS])
+        out = self.out_dir / hashed
+        if not out.exists():
+            _write_atomic(out, data)
+
+        asset = Asset(
+            logical=logical,
+            hashed=hashed,
+            path=out,
+            mimetype=mimetypes.guess_type(logical)[0] or "application/octet-stream",
+        )
+        if src.suffix.lower() not in COMPRESSIBLE_SUFFIXES or len(data) < MIN_COMPRESS_BYTES:
+            return asset
+
+        for encoding, suffix in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            variant = out.with_name(out.name + suffix)
+            if not variant.exists():
+                packed = brotli.compress(data, quality=11) if encoding == "br" else gzip.compress(data, 9, mtime=0)
+                if len(packed) >= len(data):
+                    continue
+                _write_atomic(variant, packed)
+            asset.variants[encoding] = variant
+        return asset
+
+    def _prune(self, keep: set) -> None:
+        cutoff = time.time() - STALE_ASSET_SECONDS
+        for p in self.out_dir.rglob("*"):
+            if not p.is_file() or p.name == "manifest.json":
+                continue
+            try:
+                if str(p) not in keep and p.stat().st_mtime < cutoff:
+                    p.unlink()
+            except OSError:
+                pass
+
+    def build(self) -> "StaticAssetScope":
+        t0 = time.perf_counter()
+        by_logical: Dict[str, Asset] = {}
+        for src in sorted(self.source_dir.rglob("*")):
+            rel = src.relative_to(self.source_dir)
+            if not src.is_file() or any(part.startswith(".") for part in rel.parts):
+                continue  # .keep, archivos ocultos
+            asset = self._build_one(src)
+            by_logical[asset.logical] = asset
+
+        self.by_logical = by_logical
+        self.by_hashed = {a.hashed: a for a in by_logical.values()}
+
+        manifest = {a.logical: a.hashed for a in by_logical.values()}
+        _write_atomic(self.out_dir / "manifest.json", json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+        self._prune({str(p) for a in by_logical.values() for p in (a.path, *a.variants.values())})
+
+        self.build_ms = round((time.perf_counter() - t0) * 1000, 2)
+        return self
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "source_dir": str(self.source_dir),
+            "assets": len(self.by_logical),
+            "precompressed": sorted({e for a in self.by_logical.values() for e in a.variants}),
+            "build_ms": self.build_ms,
+        }
+
+
+def _negotiate(asset: Asset) -> Tuple[Path, Optional[str]]:
+    accepted = request.accept_encodings
+    for encoding, _ in ENCODINGS:
+        variant = asset.variants.get(encoding)
+        if variant is not None and accepted[encoding] > 0:
+            return variant, encoding
+    return asset.path, None
+
+
+def install(app: Flask, scope: StaticAssetScope) -> None:
+    """
+    Conecta un scope a la app (core o hija de submódulo):
+
+    - url_for("static", filename="js/x.js") → /static/js/x.<hash>.js (url_defaults).
+    - La vista "static" sirve los nombres con hash desde el build, con Cache-Control
+      immutable y la variante precomprimida que acepte el cliente (sin comprimir por
+      request). Cualquier otro nombre cae en el send_static_file de siempre.
+    """
+    if "static" not in app.view_functions:
+        return
+    fallback = app.view_functions["static"]
+
+    @app.url_defaults
+    def _fingerprint_static(endpoint: str, values: Dict[str, Any]) -> None:
+        if endpoint == "static" and "filename" in values:
+            asset = scope.by_logical.get(values["filename"])
+            if asset is not None:
+                values["filename"] = asset.hashed
+
+    def static_view(filename: str) -> Response:
+        asset = scope.by_hashed.get(filename)
+        if asset is None:
+            return fallback(filename=filename)
+
+        path, encoding = _negotiate(asset)
+        resp = send_file(path, mimetype=asset.mimetype, conditional=True, etag=True, max_age=None)
+        if encoding is not None:
+            resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        resp.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return resp
+
+    app.view_functions["static"] = static_view
+
+
+class StaticAssetPipeline:
+    """
+    Build de assets del core y de cada submódulo con manifest (ver ModuleLoader).
+    Las apps hijas se conectan al crearse (ModuleLoader.child_hooks).
+    """
+
+    def __init__(self, out_root: Path) -> None:
+        self.out_root = out_root
+        self.scopes: Dict[str, StaticAssetScope] = {}
+
+    def add(self, name: str, source_dir: Path) -> Optional[StaticAssetScope]:
+        if not source_dir.is_dir():
+            return None
+        scope = StaticAssetScope(name, source_dir, self.out_root / name.replace("/", "__")).build()
+        self.scopes[name] = scope
+        return scope
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "out_dir": str(self.out_root),
+            "brotli": brotli is not None,
+            "scopes": {name: s.stats() for name, s in self.scopes.items()},
+        }
+
+
+def build_static_assets(app: Flask, loader: Optional[ModuleLoader] = None) -> StaticAssetPipeline:
+    """
+    Arma el pipeline (core + submódulos) sin instalarlo; lo usa también `flask assets build`.
+    """
+    pipeline = StaticAssetPipeline(Path(Settings.STATIC_ASSETS_DIR))
+    if app.static_folder:
+        pipeline.add("core", Path(app.static_folder))
+    if loader is not None:
+        for key, mod in loader.modules.items():
+            pipeline.add(key, loader.web_dir(mod) / "static")
+    return pipeline
+
+
+def init_static_assets(app: Flask, loader: Optional[ModuleLoader] = None) -> Optional[StaticAssetPipeline]:
+    """
+    Paso de startup: build + url_for con hash + vista static con immutable/precomprimidos.
+    """
+    try:
+        pipeline = build_static_assets(app, loader)
+    except OSError as e:
+        app.logger.warning("Pipeline de assets desactivado: %s", e)
+        return None
+
+    core = pipeline.scopes.get("core")
+    if core is not None:
+        install(app, core)
+
+    if loader is not None:
+        def _install_child(mod: LoadedModule, child: Flask) -> None:
+            scope = pipeline.scopes.get(mod.key)
+            if scope is not None:
+                install(child, scope)
+        loader.child_hooks.append(_install_child)
+
+    for name, scope in pipeline.scopes.items():
+        app.logger.info("Assets %s: %d en %.1f ms", name, len(scope.by_logical), scope.build_ms or 0.0)
+    app.extensions[EXTENSION_KEY] = pipeline
+    return pipeline
@@ -1,5 +1,7 @@
 from __future__ import annotations
-from typing import Dict, List, Any
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Any, Mapping, Tuple
 
 
 def get_submodule_guidelines() -> List[Dict[str, Any]]:
@@ -263,3 +265,20 @@ def get_submodule_guidelines() -> List[Dict[str, Any]]:
         ],
     },
     ]
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@lru_cache(maxsize=1)
+def frozen_submodule_guidelines() -> Tuple[Mapping[str, Any], ...]:
+    """
+    Mismo contenido que get_submodule_guidelines(), armado 1 sola vez por proceso y
+    de solo lectura (tuplas + MappingProxyType): se puede compartir entre requests.
+    """
+    return _freeze(get_submodule_guidelines())
@@ -6,12 +6,71 @@ import os
 import re
 import shutil
 import subprocess
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Callable, Dict, Iterator, Optional, List, Tuple
+
+from flask import Flask, current_app
+
+from config import Settings
+from services.file_lock import file_lock
+from services.git_cli import is_safe_branch, is_safe_repo_url
+from services.metrics import SCAFFOLD_FAILURES, WORKSPACE_SECONDS
+from services.request_timing import timed
+from services.scaffold_templates import DEFAULT_TEMPLATE
+from services.scaffolder import Scaffolder, ScaffoldError
+from services.trash_purger import TrashPurger
 
 SAFE_RE = re.compile(r"^[a-zA-Z0-9_]+$")
 
+EXTENSION_KEY = "submodule_workspace"
+
+# Formato de .selected_submodule.json: {"version", "revision", "updated_at", "selected"}.
+# Sin "version" = formato legacy (el dict del seleccionado directo), se sigue leyendo.
+SELECTED_FORMAT_VERSION = 2
+
+# progress(step, message): lo usan los jobs de init para reportar avance
+ProgressFn = Callable[[str, str], None]
+
+# (path, mtime_ns, inode, size) por archivo/carpeta observado; None si no existe
+StatKey = Tuple[str, int, int, int]
+
+
+def _write_json_atomic(path: Path, data: Any) -> None:
+    """
+    tmp + fsync + rename (+ fsync del directorio): un lector ve el archivo viejo o el
+    nuevo completo, nunca uno a medio escribir.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(data, ensure_ascii=False, indent=2))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:  # pragma: no cover - Windows no permite abrir directorios
+        return
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _stat_key(p: Path) -> Optional[StatKey]:
+    try:
+        st = os.stat(p)
+    except OSError:
+        return None
+    return (str(p), st.st_mtime_ns, st.st_ino, st.st_size)
+
 
 @dataclass
 class WorkspaceError(Exception):
@@ -28,13 +87,40 @@ class SubmoduleWorkspaceService:
       lo detecta y lo marca como seleccionado automáticamente.
     - Si el usuario intenta crear un workspace y la carpeta ya existe, en vez de 409 lo "adopta"
       (lo marca seleccionado) y devuelve OK. Esto arregla el caso del reloader.
+
+    ✅ Memo de get_selected():
+    - El resultado se guarda junto a una firma de stats (mtime/inode/size) del JSON,
+      la carpeta del workspace y su manifest; mientras la firma no cambie no se
+      relee ni se parsea nada (3 stat() por llamada).
+    - Sin JSON (cache negativo), la firma son las mtimes de modules/ y de sus
+      carpetas de 1er y 2do nivel: crear/borrar un workspace la invalida.
+    - Se comparte 1 instancia por app (init_workspace / get_workspace).
+
+    ✅ Multi-worker:
+    - El JSON se escribe con write+fsync+rename: nunca hay lecturas a medias.
+    - Toda escritura/reparación toma un flock (.selected_submodule.lock) y re-lee
+      antes de actuar: si otro worker ya reparó, se usa su resultado (la
+      reparación corre 1 vez por cambio, no 1 vez por worker).
+    - Un JSON realmente corrupto se aparta a .corrupt en vez de borrarse.
+
+    ✅ Delete no bloqueante: la carpeta se mueve a modules/.trash (rename) y se borra
+    en background (TrashPurger).
     """
 
     def __init__(self, project_root: Path) -> None:
         self.project_root = project_root.resolve()
         self.modules_root = (self.project_root / "modules").resolve()
         self.selected_file = (self.modules_root / ".selected_submodule.json").resolve()
+        self.lock_file = self.modules_root / ".selected_submodule.lock"
         self.scaffold_script = (self.project_root / "scaffold_submodule.sh").resolve()
+        self.scaffolder = Scaffolder(self.modules_root)
+        self.trash = TrashPurger(self.modules_root / ".trash", max_workers=Settings.TRASH_PURGE_WORKERS)
+
+        self._memo_lock = threading.Lock()
+        self._memo: Optional[Tuple[Tuple[Any, ...], Optional[Dict[str, Any]]]] = None
+
+        self._selection_rlock = threading.RLock()
+        self._selection_depth = 0
 
     # -----------------------
     # Helpers
@@ -45,12 +131,32 @@ class SubmoduleWorkspaceService:
             raise WorkspaceError(f"{label} inválido. Usa solo [a-zA-Z0-9_]", 400)
         return x
 
+    def _safe_repo(self, repo_url: str, branch: str) -> Tuple[str, str]:
+        # repo_url / branch llegan del cliente y terminan en argumentos de git
+        if repo_url and not is_safe_repo_url(repo_url):
+            raise WorkspaceError("repo_url inválido. Usa una URL https://, http://, ssh://, git://, file:///ruta o user@host:repo", 400)
+        if not is_safe_branch(branch):
+            raise WorkspaceError("repo_main_branch inválido.", 400)
+        return repo_url, branch
+
     def _submodule_path(self, module: str, submodule: str) -> Path:
         target = (self.modules_root / module / submodule).resolve()
         if self.modules_root not in target.parents:
             raise WorkspaceError("Ruta inválida.", 400)
         return target
 
+    def _discard_dir(self, target: Path) -> None:
+        """
+        Quita `target` al instante (rename a la papelera) y agenda el borrado real.
+        """
+        try:
+            self.trash.move_to_trash(target)
+        except OSError:
+            # otro filesystem / permisos: borrado inline como antes
+            shutil.rmtree(target, ignore_errors=True)
+            return
+        self.trash.schedule()
+
     def _is_valid_workspace_dir(self, p: Path) -> bool:
         # Marca mínima de "workspace creado"
         return (
@@ -121,58 +227,216 @@ class SubmoduleWorkspaceService:
         self._save_selected(selected)
         return selected
 
+    # -----------------------
+    # Persistencia del seleccionado
+    # -----------------------
+    @contextmanager
+    def _selection_lock(self) -> Iterator[None]:
+        """
+        Exclusión entre threads (reentrante) y entre workers (flock, 1 sola vez por thread).
+        """
+        with self._selection_rlock:
+            self._selection_depth += 1
+            try:
+                if self._selection_depth == 1:
+                    self.modules_root.mkdir(parents=True, exist_ok=True)
+                    with file_lock(self.lock_file):
+                        yield
+                else:
+                    yield
+            finally:
+                self._selection_depth -= 1
+
+    def _load_record(self) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        ("missing" | "corrupt" | "ok", record normalizado al formato actual).
+        """
+        try:
+            raw = self.selected_file.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return "missing", None
+        except OSError:
+            return "corrupt", None
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return "corrupt", None
+        if not isinstance(data, dict):
+            return "corrupt", None
+
+        if "version" not in data:
+            # legacy: el dict del seleccionado directo
+            return "ok", {"version": 1, "revision": 0, "updated_at": None, "selected": data}
+        if not isinstance(data.get("selected"), dict):
+            return "corrupt", None
+        return "ok", data
+
+    def _resolve_selected(self, record: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        El seleccionado del record si apunta a un workspace válido; si no, None.
+        """
+        data = (record or {}).get("selected") or {}
+        domain = (data.get("domain") or "").strip()
+        subdomain = (data.get("subdomain") or "").strip()
+        if not domain or not subdomain:
+            return None
+        try:
+            target = self._submodule_path(domain, subdomain)
+        except WorkspaceError:
+            return None
+        return data if self._is_valid_workspace_dir(target) else None
+
+    # -----------------------
+    # Memo
+    # -----------------------
+    def _modules_tree_signature(self) -> Tuple[Any, ...]:
+        keys: List[Optional[StatKey]] = [_stat_key(self.modules_root)]
+        try:
+            domains = sorted(e.path for e in os.scandir(self.modules_root) if e.is_dir() and not e.name.startswith("."))
+        except OSError:
+            return tuple(keys)
+        for domain in domains:
+            keys.append(_stat_key(Path(domain)))
+            try:
+                keys.extend(_stat_key(Path(e.path)) for e in os.scandir(domain) if e.is_dir())
+            except OSError:
+                continue
+        return tuple(keys)
+
+    def _signature(self, selected: Optional[Dict[str, Any]]) -> Tuple[Any, ...]:
+        """
+        Firma del estado en disco del que depende `selected`.
+        """
+        sel_key = _stat_key(self.selected_file)
+        if sel_key is None or not selected:
+            return (sel_key, self._modules_tree_signature())
+
+        target = self.modules_root / str(selected.get("domain") or "") / str(selected.get("subdomain") or "")
+        return (sel_key, _stat_key(target), _stat_key(target / "module.manifest.json"))
+
+    def invalidate(self) -> None:
+        with self._memo_lock:
+            self._memo = None
+
     # -----------------------
     # Selected handling
     # -----------------------
+    @timed("workspace_selected")
     def get_selected(self) -> Optional[Dict[str, Any]]:
         """
-        Devuelve el seleccionado.
-        ✅ Auto-repair si falta el JSON pero existe carpeta creada.
-        ✅ Si el JSON existe pero la carpeta ya no existe, se limpia.
+        Devuelve el seleccionado (copia: mutarla no afecta el memo).
+        Si nada cambió en disco desde la última lectura, no toca el JSON.
         """
-        try:
-            if self.selected_file.exists():
-                data = json.loads(self.selected_file.read_text(encoding="utf-8")) or {}
-                domain = (data.get("domain") or "").strip()
-                subdomain = (data.get("subdomain") or "").strip()
-                if domain and subdomain:
-                    target = self._submodule_path(domain, subdomain)
-                    if self._is_valid_workspace_dir(target):
-                        return data
-                    # si ya no existe, limpiamos
-                    self.clear_selected()
-                    return None
-                # json corrupto/incompleto
+        with self._memo_lock:
+            memo = self._memo
+        if memo is not None:
+            signature, cached = memo
+            if self._signature(cached) == signature:
+                return dict(cached) if cached is not None else None
+
+        selected = self._read_selected()
+        # firma tomada después de leer: si algo cambió entremedio, la próxima llamada relee
+        with self._memo_lock:
+            self._memo = (self._signature(selected), selected)
+        return dict(selected) if selected is not None else None
+
+    def _read_selected(self) -> Optional[Dict[str, Any]]:
+        """
+        Lectura real del seleccionado.
+        ✅ Camino feliz sin lock: el JSON siempre está completo (escritura atómica).
+        ✅ Auto-repair (bajo lock y re-leyendo) si falta el JSON, está corrupto o la
+           carpeta ya no existe.
+        """
+        status, record = self._load_record()
+        selected = self._resolve_selected(record) if status == "ok" else None
+        if selected is not None:
+            return selected
+
+        with self._selection_lock():
+            # otro worker pudo reparar mientras esperábamos el lock
+            status, record = self._load_record()
+            if status == "ok":
+                selected = self._resolve_selected(record)
+                if selected is not None:
+                    return selected
+                # JSON válido pero el workspace ya no existe / está incompleto
                 self.clear_selected()
-                return None
-        except Exception:
-            # si el archivo está corrupto, lo limpiamos
+            elif status == "corrupt":
+                try:
+                    os.replace(self.selected_file, self.selected_file.with_name(self.selected_file.name + ".corrupt"))
+                except OSError:
+                    self.clear_selected()
+                self.invalidate()
+
+            # ✅ si no hay selected_file, intentamos descubrir
             try:
-                self.clear_selected()
+                return self._discover_existing_workspace()
             except Exception:
-                pass
-
-        # ✅ si no hay selected_file, intentamos descubrir
-        try:
-            return self._discover_existing_workspace()
-        except Exception:
-            return None
+                return None
 
     def _save_selected(self, data: Dict[str, Any]) -> None:
-        self.modules_root.mkdir(parents=True, exist_ok=True)
-        self.selected_file.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        with self._selection_lock():
+            _, current = self._load_record()
+            record = {
+                "version": SELECTED_FORMAT_VERSION,
+                "revision": int((current or {}).get("revision") or 0) + 1,
+                "updated_at": time.time(),
+                "selected": data,
+            }
+            _write_json_atomic(self.selected_file, record)
+        self.invalidate()
 
     def clear_selected(self) -> None:
-        if self.selected_file.exists():
+        with self._selection_lock():
             self.selected_file.unlink(missing_ok=True)
+        self.invalidate()
+
+    @timed("scaffold_script", background=True)
+    def _run_scaffold_script(
+        self,
+        module: str,
+        submodule: str,
+        repo_url: str,
+        branch: str,
+        target: Path,
+    ) -> Optional[str]:
+        """
+        Fallback: scaffold_submodule.sh para templates que el scaffolder nativo no conoce.
+        Devuelve un warning si el bash falló pero el workspace quedó completo.
+        """
+        cmd = ["bash", str(self.scaffold_script), module, submodule]
+        if repo_url:
+            cmd += [repo_url, branch]
+
+        try:
+            subprocess.run(
+                cmd,
+                cwd=str(self.project_root),
+                check=True,
+                capture_output=True,
+                text=True,
+                env={**os.environ},
+            )
+        except subprocess.CalledProcessError as e:
+            # ✅ WORKAROUND: si el bash falló al final pero el workspace está completo, lo aceptamos
+            if self._is_valid_workspace_dir(target):
+                raw = (e.stderr or e.stdout or "").strip()
+                return raw[:400] if raw else "El scaffold terminó con warning, pero el workspace fue creado."
+            if target.exists():
+                self._discard_dir(target)
+            msg = (e.stderr or e.stdout or "").strip()[:600] or "Error ejecutando scaffold_submodule.sh"
+            raise WorkspaceError(msg, 500)
+        return None
 
     # -----------------------
     # Actions
     # -----------------------
-    def init_submodule(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    def validate_init(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chequeos de init_submodule que no tocan git ni la red: el request los corre antes
+        de encolar el job, así un payload inválido o el 409 vuelven directo (no un 202).
+        Devuelve los campos normalizados.
+        """
         # Regla: 1 submódulo por bundle
         if self.get_selected():
             raise WorkspaceError(
@@ -183,15 +447,41 @@ class SubmoduleWorkspaceService:
         module = self._safe_name(payload.get("domain") or "", "MODULE")
         submodule = self._safe_name(payload.get("subdomain") or "", "SUBMODULE")
 
-        repo_url = (payload.get("repo_url") or "").strip()
-        branch = (payload.get("repo_main_branch") or "main").strip() or "main"
+        repo_url, branch = self._safe_repo(
+            (payload.get("repo_url") or "").strip(),
+            (payload.get("repo_main_branch") or "main").strip() or "main",
+        )
+        template = (payload.get("bundle_template") or DEFAULT_TEMPLATE).strip()
+
+        # ✅ Scaffold nativo si conocemos el template; el bash queda solo como fallback
+        native = self.scaffolder.supports(template)
+        if not native and not self.scaffold_script.exists():
+            raise WorkspaceError(f"bundle_template no soportado: {template}", 400)
+
+        return {
+            "module": module,
+            "submodule": submodule,
+            "repo_url": repo_url,
+            "branch": branch,
+            "template": template,
+            "native": native,
+        }
+
+    @timed("workspace_init", background=True)
+    @WORKSPACE_SECONDS.timed(operation="init")
+    def init_submodule(self, payload: Dict[str, Any], progress: Optional[ProgressFn] = None) -> Dict[str, Any]:
+        report: ProgressFn = progress or (lambda step, message: None)
+
+        # se repite en el job: la selección pudo cambiar mientras estaba encolado
+        report("validate", "Validando payload y workspace actual")
+        spec = self.validate_init(payload)
+        module, submodule = spec["module"], spec["submodule"]
+        repo_url, branch = spec["repo_url"], spec["branch"]
+        template, native = spec["template"], spec["native"]
 
         # Asegurar modules/
         self.modules_root.mkdir(parents=True, exist_ok=True)
 
-        if not self.scaffold_script.exists():
-            raise WorkspaceError("No existe scaffold_submodule.sh en el root del proyecto.", 500)
-
         target = self._submodule_path(module, submodule)
 
         # ✅ Caso clave: la carpeta ya existe (reloader reinició antes de guardar selected)
@@ -214,37 +504,36 @@ class SubmoduleWorkspaceService:
                         "Se marcó como seleccionado automáticamente."
                     ),
                 }
+                report("adopt", "La carpeta ya existía: se adopta como seleccionado")
                 self._save_selected(selected)
                 return selected
 
             # si existe pero está incompleto, limpiamos y volvemos a crear
-            shutil.rmtree(target, ignore_errors=True)
-
-        cmd = ["bash", str(self.scaffold_script), module, submodule]
-        if repo_url:
-            cmd += [repo_url, branch]
+            report("cleanup", "Workspace incompleto: se borra y se vuelve a crear")
+            self._discard_dir(target)
 
+        report("scaffold", f"Generando modules/{module}/{submodule}" + (f" desde {repo_url}" if repo_url else ""))
         warning_msg: Optional[str] = None
-
-        try:
-            subprocess.run(
-                cmd,
-                cwd=str(self.project_root),
-                check=True,
-                capture_output=True,
-                text=True,
-                env={**os.environ},
-            )
-        except subprocess.CalledProcessError as e:
-            # ✅ WORKAROUND: si el bash falló al final pero el workspace está completo, lo aceptamos
-            if self._is_valid_workspace_dir(target):
-                raw = (e.stderr or e.stdout or "").strip()
-                warning_msg = (raw[:400] if raw else "El scaffold terminó con warning, pero el workspace fue creado.")
-            else:
-                if target.exists():
-                    shutil.rmtree(target, ignore_errors=True)
-                msg = (e.stderr or e.stdout or "").strip()[:600] or "Error ejecutando scaffold_submodule.sh"
-                raise WorkspaceError(msg, 500)
+        if native:
+            try:
+                self.scaffolder.scaffold(
+                    template,
+                    module,
+                    submodule,
+                    target,
+                    repo_url=repo_url or None,
+                    branch=branch,
+                    progress=report,
+                )
+            except ScaffoldError as e:
+                SCAFFOLD_FAILURES.inc(template=template)
+                raise WorkspaceError(e.message, e.status_code)
+        else:
+            try:
+                warning_msg = self._run_scaffold_script(module, submodule, repo_url, branch, target)
+            except WorkspaceError:
+                SCAFFOLD_FAILURES.inc(template=template)
+                raise
 
         selected = {
             "id": payload.get("id"),
@@ -261,9 +550,11 @@ class SubmoduleWorkspaceService:
         if warning_msg:
             selected["scaffold_warning"] = warning_msg
 
+        report("save", "Marcando workspace como seleccionado")
         self._save_selected(selected)
         return selected
 
+    @WORKSPACE_SECONDS.timed(operation="delete")
     def delete_selected(self) -> None:
         selected = self.get_selected()
         if not selected:
@@ -273,15 +564,37 @@ class SubmoduleWorkspaceService:
         submodule = self._safe_name(selected.get("subdomain") or "", "SUBMODULE")
 
         target = self._submodule_path(module, submodule)
-        if target.exists():
-            shutil.rmtree(target, ignore_errors=True)
+        with self._selection_lock():
+            if target.exists():
+                try:
+                    self.trash.move_to_trash(target)
+                except OSError as e:
+                    raise WorkspaceError(f"No se pudo mover el workspace a la papelera: {e.strerror or e}", 500)
+
+            # borrar carpeta domain si queda vacía
+            module_dir = (self.modules_root / module).resolve()
+            try:
+                if module_dir.exists() and module_dir.is_dir() and not any(module_dir.iterdir()):
+                    module_dir.rmdir()
+            except Exception:
+                pass
+
+            self.clear_selected()
+
+        # el borrado real (puede tardar segundos) corre en background
+        self.trash.schedule()
+
+
+def init_workspace(app: Flask) -> SubmoduleWorkspaceService:
+    """
+    1 servicio por app (con su memo), anclado al root del proyecto.
+    """
+    svc = SubmoduleWorkspaceService(Path(app.root_path))
+    app.extensions[EXTENSION_KEY] = svc
+    # restos de deletes interrumpidos por un reinicio
+    svc.trash.schedule()
+    return svc
 
-        # borrar carpeta domain si queda vacía
-        module_dir = (self.modules_root / module).resolve()
-        try:
-            if module_dir.exists() and module_dir.is_dir() and not any(module_dir.iterdir()):
-                module_dir.rmdir()
-        except Exception:
-            pass
 
-        self.clear_selected()
+def get_workspace() -> SubmoduleWorkspaceService:
+    return current_app.extensions[EXTENSION_KEY]
@@ -0,0 +1,81 @@
+# services/template_cache.py
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from flask import Flask
+from jinja2 import Environment, FileSystemBytecodeCache, TemplateError
+
+from config import Settings
+from services.module_loader import ModuleLoader
+
+EXTENSION_KEY = "template_warmup"
+
+# Solo páginas/partials: el resto (ej. .txt, .md) no se renderiza con Jinja
+TEMPLATE_SUFFIXES = (".html", ".jinja", ".j2")
+
+
+def init_template_cache(app: Flask) -> Optional[Path]:
+    """
+    Bytecode de Jinja en disco (BUNDLE_CACHE_DIR/jinja), compartido por todos los workers.
+
+    - La clave es nombre + path del template; Jinja valida el checksum del source, así que
+      un template editado se recompila solo (no hace falta limpiar nada al deployar).
+    - Las escrituras de Jinja son tmp + rename: varios workers pueden compilar a la vez.
+    """
+    if not Settings.TEMPLATE_BYTECODE_CACHE:
+        return None
+    cache_dir = Path(Settings.TEMPLATE_CACHE_DIR)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        app.logger.warning("Bytecode cache de Jinja desactivado (%s): %s", cache_dir, e)
+        return None
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(str(cache_dir))
+    return cache_dir
+
+
+def _compile_all(env: Environment) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    compiled = 0
+    errors: List[str] = []
+    for name in env.list_templates(extensions=[s.lstrip(".") for s in TEMPLATE_SUFFIXES]):
+        try:
+            env.get_template(name)  # compila (o carga el bytecode) y queda en env.cache
+            compiled += 1
+        except TemplateError as e:
+            errors.append(f"{name}: {e}")
+    return {
+        "templates": compiled,
+        "errors": errors,
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def warm_templates(app: Flask, loader: Optional[ModuleLoader] = None) -> Dict[str, Any]:
+    """
+    Precompila templates/ del core y los de cada submódulo con manifest.
+
+    - Core: quedan en memoria de este worker (env.cache) y en el bytecode cache.
+    - Submódulos: se compilan sin importar su paquete (ver ModuleLoader.template_env);
+      a la app hija le llega el bytecode ya hecho en su 1er request.
+    """
+    report: Dict[str, Any] = {"core": _compile_all(app.jinja_env), "modules": {}}
+    if loader is not None:
+        for key, mod in loader.modules.items():
+            try:
+                report["modules"][key] = _compile_all(loader.template_env(mod))
+            except Exception as e:
+                report["modules"][key] = {"templates": 0, "errors": [str(e)], "ms": 0.0}
+
+    for scope, result in [("core", report["core"]), *report["modules"].items()]:
+        app.logger.info(
+            "Templates %s: %d compilados en %.1f ms", scope, result["templates"], result["ms"],
+        )
+        for err in result["errors"]:
+            app.logger.warning("Template %s no compila: %s", scope, err)
+
+    app.extensions[EXTENSION_KEY] = report
+    return report
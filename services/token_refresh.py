@@ -0,0 +1,215 @@
+# services/token_refresh.py
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import Settings
+from services.file_lock import FileLockTimeout, file_lock
+
+# Un refresh_token rotado no se vuelve a usar; pasado este tiempo su lock es basura
+LOCK_FILE_MAX_AGE_SECONDS = 600
+
+# Marca de "access rechazado con 401" (el refresh queda para el próximo request)
+REJECTED_MARK_MAX_AGE_SECONDS = 24 * 3600
+
+RefreshFn = Callable[[str], Optional[Dict[str, Any]]]
+
+
+class SingleFlightRefresher:
+    """
+    Coalesce de refresh de tokens: 1 refresh en vuelo por refresh_token.
+
+    - Entre threads: un threading.Lock por refresh_token.
+    - Entre workers: flock sobre <state_dir>/<hash>.lock.
+    - El resultado se guarda unos segundos (memoria + <hash>.result con permisos 0600)
+      para que los requests que llegan tarde con el refresh_token viejo reusen el
+      token nuevo en vez de quemar un refresh token rotado. En disco va cifrado
+      (Fernet con clave derivada de SECRET_KEY) y se borra pasado result_ttl: el
+      refresh_token nuevo nunca queda en claro.
+    - mark_rejected(): un access que Cubicornio rechazó (401) donde no se podía escribir
+      la session (ej. una página en streaming). El próximo request lo ve con
+      is_rejected() y refresca antes de mandar nada (<hash del access>.rejected).
+    """
+
+    def __init__(
+        self,
+        state_dir: Path,
+        result_ttl_seconds: float,
+        lock_timeout_seconds: float,
+        secret_key: str,
+    ) -> None:
+        self.state_dir = state_dir
+        self.result_ttl_seconds = result_ttl_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self._secret_key = secret_key
+        self._cipher: Any = None
+
+        self._guard = threading.Lock()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._results: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._rejected: Dict[str, float] = {}
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    @staticmethod
+    def _key(refresh_token: str) -> str:
+        return hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+
+    def _thread_lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _result_path(self, key: str) -> Path:
+        return self.state_dir / f"{key}.result"
+
+    def _fernet(self) -> Any:
+        # diferido: cryptography (dependencia de authlib) solo se carga al 1er refresh
+        if self._cipher is None:
+            from cryptography.fernet import Fernet
+
+            digest = hashlib.sha256(f"token-refresh:{self._secret_key}".encode("utf-8")).digest()
+            self._cipher = Fernet(base64.urlsafe_b64encode(digest))
+        return self._cipher
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return (time.time() - created_at) < self.result_ttl_seconds
+
+    def _load_result(self, key: str) -> Optional[Dict[str, Any]]:
+        mem = self._results.get(key)
+        if mem and self._is_fresh(mem[0]):
+            return mem[1]
+
+        from cryptography.fernet import InvalidToken
+
+        path = self._result_path(key)
+        try:
+            raw = json.loads(self._fernet().decrypt(path.read_bytes()))
+        except (OSError, ValueError, InvalidToken):
+            # inexistente, vencido o cifrado con otro SECRET_KEY: como si no hubiera
+            return None
+
+        created_at = float(raw.get("created_at") or 0)
+        token = raw.get("token")
+        if not isinstance(token, dict) or not self._is_fresh(created_at):
+            return None
+        self._results[key] = (created_at, token)
+        return token
+
+    def _store_result(self, key: str, token: Dict[str, Any]) -> None:
+        created_at = time.time()
+        self._results[key] = (created_at, token)
+
+        path = self._result_path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            payload = json.dumps({"created_at": created_at, "token": token}).encode("utf-8")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(self._fernet().encrypt(payload))
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def purge_expired(self) -> None:
+        """
+        Limpia resultados vencidos (memoria y disco), locks viejos y marcas de rechazo.
+        Corre tras cada refresh y al arrancar (restos de un worker que murió).
+        """
+        now = time.time()
+        for key, (created_at, _) in list(self._results.items()):
+            if not self._is_fresh(created_at):
+                self._results.pop(key, None)
+        for key, marked_at in list(self._rejected.items()):
+            if now - marked_at > REJECTED_MARK_MAX_AGE_SECONDS:
+                self._rejected.pop(key, None)
+
+        with self._guard:
+            for key, lock in list(self._locks.items()):
+                if key not in self._results and not lock.locked():
+                    self._locks.pop(key, None)
+
+        try:
+            entries = list(self.state_dir.iterdir())
+        except OSError:
+            return
+        for p in entries:
+            # los .lock se conservan bastante más: borrar uno en uso rompería la exclusión
+            if p.suffix == ".lock":
+                max_age = LOCK_FILE_MAX_AGE_SECONDS
+            elif p.suffix == ".rejected":
+                max_age = REJECTED_MARK_MAX_AGE_SECONDS
+            else:
+                max_age = self.result_ttl_seconds
+            try:
+                if now - p.stat().st_mtime > max_age:
+                    p.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    # -----------------------
+    # API
+    # -----------------------
+    def mark_rejected(self, access_token: str) -> None:
+        key = self._key(access_token)
+        self._rejected[key] = time.time()
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            (self.state_dir / f"{key}.rejected").touch()
+        except OSError:
+            pass
+
+    def is_rejected(self, access_token: str) -> bool:
+        key = self._key(access_token)
+        if key in self._rejected:
+            return True
+        return (self.state_dir / f"{key}.rejected").exists()
+
+    def refresh(self, refresh_token: str, do_refresh: RefreshFn) -> Optional[Dict[str, Any]]:
+        key = self._key(refresh_token)
+
+        cached = self._load_result(key)
+        if cached is not None:
+            return cached
+
+        with self._thread_lock(key):
+            cached = self._load_result(key)
+            if cached is not None:
+                return cached
+
+            try:
+                with file_lock(self.state_dir / f"{key}.lock", timeout=self.lock_timeout_seconds):
+                    # otro worker pudo terminar el refresh mientras esperábamos
+                    cached = self._load_result(key)
+                    if cached is not None:
+                        return cached
+
+                    new_tok = do_refresh(refresh_token)
+                    if new_tok:
+                        self._store_result(key, new_tok)
+            except FileLockTimeout:
+                # el dueño del lock está colgado: mejor intentar que desloguear
+                new_tok = do_refresh(refresh_token)
+                if new_tok:
+                    self._store_result(key, new_tok)
+
+        self.purge_expired()
+        return new_tok
+
+
+token_refresher = SingleFlightRefresher(
+    state_dir=Path(Settings.BUNDLE_CACHE_DIR) / "token_refresh",
+    result_ttl_seconds=Settings.TOKEN_REFRESH_RESULT_TTL_SECONDS,
+    lock_timeout_seconds=Settings.TOKEN_REFRESH_LOCK_TIMEOUT_SECONDS,
+    secret_key=Settings.SECRET_KEY,
+)
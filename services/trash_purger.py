@@ -0,0 +1,96 @@
+# services/trash_purger.py
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+
+class TrashPurger:
+    """
+    Borrado diferido de carpetas grandes (workspaces con repo, node_modules, builds).
+
+    - move_to_trash(): rename atómico a <trash_dir>/<nombre>-<uuid> (mismo filesystem):
+      el request vuelve al instante y la carpeta deja de existir para el resto.
+    - El espacio se recupera en background con un pool acotado (max_workers), así un
+      rmtree de varios GB no compite con los requests.
+    - Lo que quedó en la papelera tras un reinicio se vuelve a encolar con schedule().
+    """
+
+    def __init__(self, trash_dir: Path, max_workers: int) -> None:
+        self.trash_dir = trash_dir
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="trash-purge")
+        self._lock = threading.Lock()
+        self._in_flight: Set[str] = set()
+
+        self.purged = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+        self.last_purged_at: Optional[float] = None
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    def _purge(self, path: Path) -> None:
+        shutil.rmtree(path, ignore_errors=True)
+        with self._lock:
+            self._in_flight.discard(path.name)
+            if path.exists():
+                # queda en la papelera: el próximo schedule() lo reintenta
+                self.failed += 1
+                self.last_error = f"No se pudo borrar por completo: {path.name}"
+            else:
+                self.purged += 1
+                self.last_purged_at = time.time()
+
+    # -----------------------
+    # API
+    # -----------------------
+    def move_to_trash(self, path: Path) -> Path:
+        """
+        Saca `path` de su lugar con 1 rename. Lanza OSError si no se puede mover.
+        """
+        self.trash_dir.mkdir(parents=True, exist_ok=True)
+        dest = self.trash_dir / f"{path.name}-{uuid.uuid4().hex[:12]}"
+        os.rename(path, dest)
+        return dest
+
+    def schedule(self) -> int:
+        """
+        Encola el purge de todo lo que haya en la papelera y no esté en curso.
+        """
+        try:
+            entries = list(self.trash_dir.iterdir())
+        except OSError:
+            return 0
+
+        queued = 0
+        with self._lock:
+            for p in entries:
+                if p.name in self._in_flight:
+                    continue
+                self._in_flight.add(p.name)
+                self._executor.submit(self._purge, p)
+                queued += 1
+        return queued
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            pending = sorted(p.name for p in self.trash_dir.iterdir())
+        except OSError:
+            pending = []
+        with self._lock:
+            return {
+                "trash_dir": str(self.trash_dir),
+                "pending": pending,
+                "in_flight": sorted(self._in_flight),
+                "purged": self.purged,
+                "failed": self.failed,
+                "last_error": self.last_error,
+                "last_purged_at": self.last_purged_at,
+            }
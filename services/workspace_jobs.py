@@ -0,0 +1,178 @@
+# services/workspace_jobs.py
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import Settings
+from services.file_lock import file_lock
+from services.submodule_workspace import SubmoduleWorkspaceService, WorkspaceError
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+ACTIVE_STATES = frozenset({QUEUED, RUNNING})
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Sugerencia para el cliente: cada cuánto volver a consultar un job activo
+POLL_AFTER_MS = 700
+
+
+def _pid_alive(pid: Any) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+
+class WorkspaceJobManager:
+    """
+    Jobs en background para crear workspaces (POST /api/workspace/init → 202).
+
+    - Corren en un pool acotado: el request vuelve al instante con el job id.
+    - El estado vive en <jobs_dir>/<id>.json (escritura atómica): cualquier worker
+      puede responder el polling, y sobrevive al reloader.
+    - Si el proceso que corría el job murió (reinicio a mitad del scaffold), el job
+      se reporta como failed con `interrupted=True`; el cliente revisa si el
+      workspace quedó creado igual (auto-repair de SubmoduleWorkspaceService).
+    - Un solo init a la vez: un job activo para el mismo destino se reutiliza, y la
+      ejecución se serializa con un flock entre workers.
+    """
+
+    def __init__(self, jobs_dir: Path, max_workers: int, ttl_seconds: float) -> None:
+        self.jobs_dir = jobs_dir
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ws-jobs")
+        self._lock = threading.Lock()
+
+    # -----------------------
+    # Helpers
+    # -----------------------
+    def _path(self, job_id: str) -> Path:
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _write(self, job: Dict[str, Any]) -> None:
+        job["updated_at"] = time.time()
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(job["id"])
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(job, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(job_id).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _with_liveness(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        if job.get("state") in ACTIVE_STATES and not _pid_alive(job.get("pid")):
+            job = {
+                **job,
+                "state": FAILED,
+                "interrupted": True,
+                "error": "El servidor se reinició mientras se creaba el workspace.",
+                "status_code": 500,
+            }
+        return job
+
+    def _iter_jobs(self) -> List[Dict[str, Any]]:
+        try:
+            paths = list(self.jobs_dir.glob("*.json"))
+        except OSError:
+            return []
+        jobs = []
+        for p in paths:
+            job = self._read(p.stem)
+            if job:
+                jobs.append(self._with_liveness(job))
+        return jobs
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        for job in self._iter_jobs():
+            if job.get("state") not in ACTIVE_STATES and now - float(job.get("updated_at") or 0) > self.ttl_seconds:
+                self._path(job["id"]).unlink(missing_ok=True)
+
+    def _run_init(self, job: Dict[str, Any], svc: SubmoduleWorkspaceService, payload: Dict[str, Any]) -> None:
+        def progress(step: str, message: str) -> None:
+            job["steps"].append({"step": step, "message": message, "ts": time.time()})
+            self._write(job)
+
+        try:
+            with file_lock(self.jobs_dir / "init.lock"):
+                job["state"] = RUNNING
+                progress("start", "Job iniciado")
+                job["result"] = svc.init_submodule(payload, progress=progress)
+                job["state"] = SUCCEEDED
+                progress("done", "Workspace listo")
+        except WorkspaceError as e:
+            job.update(state=FAILED, error=e.message, status_code=e.status_code)
+            self._write(job)
+        except Exception as e:
+            job.update(state=FAILED, error=f"Error interno: {e.__class__.__name__}", status_code=500)
+            self._write(job)
+
+    # -----------------------
+    # API
+    # -----------------------
+    def submit_init(self, svc: SubmoduleWorkspaceService, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Encola la creación del workspace y devuelve el job (o el job activo equivalente).
+        La validación (payload, submódulo ya seleccionado) corre acá, en el request:
+        WorkspaceError sale directo y solo el scaffold queda en background.
+        """
+        spec = svc.validate_init(payload)
+        target = f"{spec['module']}/{spec['submodule']}"
+
+        with self._lock:
+            self._purge_expired()
+            for job in self._iter_jobs():
+                if job.get("kind") != "init" or job.get("state") not in ACTIVE_STATES:
+                    continue
+                if job.get("target") == target:
+                    return job
+                raise WorkspaceError(f"Ya se está creando otro workspace ({job.get('target')}).", 409)
+
+            now = time.time()
+            job: Dict[str, Any] = {
+                "id": uuid.uuid4().hex,
+                "kind": "init",
+                "target": target,
+                "state": QUEUED,
+                "steps": [],
+                "result": None,
+                "error": None,
+                "status_code": None,
+                "pid": os.getpid(),
+                "created_at": now,
+            }
+            self._write(job)
+
+        snapshot = {**job, "steps": []}
+        self._executor.submit(self._run_init, job, svc, dict(payload))
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not JOB_ID_RE.match(job_id or ""):
+            return None
+        job = self._read(job_id)
+        return self._with_liveness(job) if job else None
+
+
+workspace_jobs = WorkspaceJobManager(
+    jobs_dir=Path(Settings.BUNDLE_CACHE_DIR) / "jobs",
+    max_workers=Settings.WORKSPACE_JOB_WORKERS,
+    ttl_seconds=Settings.WORKSPACE_JOB_TTL_SECONDS,
+)
@@ -90,7 +90,90 @@
     return null;
   }
 
+  // -----------------------
+  // Búsqueda (GET /api/guidelines/search?q=)
+  // -----------------------
+  const SEARCH_DEBOUNCE_MS = 120;
+
+  function escapeHtml(s) {
+    return String(s ?? "").replace(/[&<>"']/g, c => ({
+      "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    }[c]));
+  }
+
+  function renderResults(box, data) {
+    const results = (data && data.results) || [];
+    if (!results.length) {
+      box.innerHTML = `<div class="px-3 py-2 text-sm text-zinc-400">Sin resultados para “${escapeHtml(data.q)}”.</div>`;
+      return;
+    }
+    box.innerHTML = results.map(r => `
+      <button type="button"
+              class="searchResult w-full text-left rounded-xl px-3 py-2 hover:bg-slate-900 transition"
+              data-guideline="${escapeHtml(r.id)}">
+        <div class="flex items-center gap-2">
+          <span class="text-[11px] font-black text-zinc-400">${escapeHtml(r.id)}</span>
+          <span class="text-sm font-black text-zinc-100 truncate">${escapeHtml(r.title)}</span>
+        </div>
+        <div class="mt-0.5 text-xs text-zinc-400 truncate">${escapeHtml(r.group_title)} · ${escapeHtml(r.summary)}</div>
+      </button>
+    `).join("");
+  }
+
+  function initSearch() {
+    const input = document.getElementById("guidelinesSearch");
+    const box = document.getElementById("guidelinesSearchResults");
+    if (!input || !box) return;
+
+    let timer = null;
+    let seq = 0;
+
+    function hide() { box.classList.add("hidden"); }
+
+    async function run() {
+      const q = input.value.trim();
+      const mine = ++seq;
+      if (!q) { hide(); return; }
+
+      try {
+        const url = `${input.dataset.searchUrl}?q=${encodeURIComponent(q)}`;
+        const res = await fetch(url, { headers: { "Accept": "application/json" } });
+        const data = await res.json();
+        if (mine !== seq) return; // llegó tarde: ya hay otra búsqueda en curso
+        renderResults(box, data);
+        box.classList.remove("hidden");
+      } catch (e) {
+        if (mine === seq) hide();
+      }
+    }
+
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(run, SEARCH_DEBOUNCE_MS);
+    });
+    input.addEventListener("keydown", (ev) => {
+      if (ev.key === "Escape") { input.value = ""; hide(); }
+      if (ev.key === "Enter") {
+        const first = box.querySelector(".searchResult");
+        if (first) first.click();
+      }
+    });
+
+    box.addEventListener("click", (ev) => {
+      const btn = ev.target.closest(".searchResult");
+      if (!btn) return;
+      setActive(btn.dataset.guideline);
+      hide();
+    });
+
+    document.addEventListener("click", (ev) => {
+      if (!box.contains(ev.target) && ev.target !== input) hide();
+    });
+  }
+
   document.addEventListener("DOMContentLoaded", () => {
+    initSearch();
+
     // grupos colapsados al inicio
     openGroup("");
 
@@ -88,6 +88,41 @@ popup: "rounded-3xl border-2 border-emerald-400 bg-zinc-950 text-zinc-100 shadow
     return data;
   }
 
+  // ===========================
+  // JOBS (init async: 202 + polling)
+  // ===========================
+  async function followJob(job, pollAfterMs, onStep) {
+    let current = job;
+    let shownSteps = 0;
+
+    while (current.state === "queued" || current.state === "running") {
+      await sleep(pollAfterMs || 700);
+
+      let data;
+      try {
+        data = await apiGet(`/api/workspace/jobs/${current.id}`);
+      } catch (e) {
+        // servidor reiniciando: reintentamos en el próximo tick
+        continue;
+      }
+      if (!data.ok) throw new Error(data.error || "Job no encontrado");
+
+      current = data.job;
+      pollAfterMs = data.poll_after_ms || pollAfterMs;
+
+      const steps = current.steps || [];
+      if (onStep && steps.length > shownSteps) {
+        onStep(steps[steps.length - 1]);
+        shownSteps = steps.length;
+      }
+    }
+
+    if (current.state !== "succeeded") {
+      throw new Error(current.error || "No se pudo crear el workspace");
+    }
+    return current.result;
+  }
+
   function renderSelectedCard(sel) {
     selected = sel;
 
@@ -270,7 +305,7 @@ popup: "rounded-3xl border-2 border-emerald-400 bg-zinc-950 text-zinc-100 shadow
         // loading modal (oscuro + borde visible, sin azul)
         swal.fire({
           title: "Creando workspace…",
-          html: `<div class="text-sm text-zinc-300">Generando carpetas y scaffold. No cierres esta pestaña.</div>`,
+          html: `<div id="jobStepText" class="text-sm text-zinc-300">Generando carpetas y scaffold. No cierres esta pestaña.</div>`,
           allowOutsideClick: false,
           allowEscapeKey: false,
           showConfirmButton: false,
@@ -281,7 +316,11 @@ popup: "rounded-3xl border-2 border-emerald-400 bg-zinc-950 text-zinc-100 shadow
           const initData = await apiGet(`/api/submodules/${sid}/init`);
           if (!initData.ok) throw new Error(initData.error || "No se pudo obtener payload");
 
-          const out = await apiPost("/api/workspace/init", initData.payload);
+          const queued = await apiPost("/api/workspace/init", initData.payload);
+          await followJob(queued.job, queued.poll_after_ms, (step) => {
+            const el = document.getElementById("jobStepText");
+            if (el && step && step.message) el.textContent = `${step.message}…`;
+          });
 
           await loadSelected();
           await loadList();